@@ -1,29 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import closing
-import json
+from functools import partial
+import os
+import queue
 from http.client import RemoteDisconnected
+from http.cookiejar import Cookie, CookieJar
 from math import ceil
 import re
-from typing import Generator
+from typing import Generator, Optional
 from urllib.error import HTTPError, URLError
 from urllib.parse import quote_plus
-from urllib.request import urlopen, Request
+from urllib.request import Request
 
-from calibre import browser
 from calibre.gui2 import open_url
 from calibre.gui2.store import StorePlugin
 from calibre.gui2.store.search_result import SearchResult
 from calibre.gui2.store.web_store_dialog import WebStoreDialog
+from calibre_plugins.store_annas_archive.availability import AvailabilityScanner, AvailabilityStore, wanted_item_key
+from calibre_plugins.store_annas_archive.cancellation import CancelToken, Cancelled, cancellable, current_token
+from calibre_plugins.store_annas_archive.covers import CoverCache
+from calibre_plugins.store_annas_archive.downloader import ChecksumMismatch, SegmentedDownload
+from calibre_plugins.store_annas_archive.instrumentation import StallWatchdog
+from calibre_plugins.store_annas_archive.isbn import canonical_isbn, canonical_isbns, is_isbn_like
+from calibre_plugins.store_annas_archive.content_types import ContentTypeKnowledge
 from calibre_plugins.store_annas_archive.constants import DEFAULT_MIRRORS, RESULTS_PER_PAGE, SearchOption
+from calibre_plugins.store_annas_archive.local_index import LocalIndex
+from calibre_plugins.store_annas_archive.parsing import (ParsePool, parse_detail_page, parse_download_links,
+                                                         parse_search_page)
+from calibre_plugins.store_annas_archive.ratelimit import PREFETCH, Throttled, current_priority, priority, status_of
+from calibre_plugins.store_annas_archive.service import shared_service
+from calibre_plugins.store_annas_archive.wanted_index import WantedIndex, row_changes, wanted_list_version
+from calibre_plugins.store_annas_archive.wanted_stream import WantedList, ingest_wanted
 from lxml import html
 
 try:
-    from qt.core import Qt, QUrl
-    from qt.widgets import (QDialog, QWidget, QListWidget, QListWidgetItem, QVBoxLayout, QHBoxLayout, QPushButton,
-                             QLabel, QSplitter)
+    from qt.core import Qt, QUrl, QTimer, QIcon, QPixmap, QSize, QObject, QEvent, pyqtSignal
+    from qt.widgets import (QApplication, QDialog, QWidget, QListWidget, QListWidgetItem, QVBoxLayout, QHBoxLayout,
+                             QPushButton, QLabel, QSplitter, QLineEdit, QStackedWidget)
 except (ImportError, ModuleNotFoundError):
-    from PyQt5.QtCore import Qt
-    from PyQt5.QtWidgets import (QDialog, QWidget, QListWidget, QListWidgetItem, QVBoxLayout, QHBoxLayout, QPushButton,
-                                 QLabel, QSplitter)
+    from PyQt5.QtCore import Qt, QTimer, QSize, QObject, QEvent, pyqtSignal
+    from PyQt5.QtGui import QIcon, QPixmap
+    from PyQt5.QtWidgets import (QApplication, QDialog, QWidget, QListWidget, QListWidgetItem, QVBoxLayout,
+                                 QHBoxLayout, QPushButton, QLabel, QSplitter, QLineEdit, QStackedWidget)
     from PyQt5.Qt import QUrl
 
 # Optional web engine view for inline store dialog
@@ -42,17 +60,150 @@ if QWebEngineView is None:
     except Exception:
         QWebEngineView = None
 
+try:
+    from qt.webenginecore import QWebEngineProfile, QWebEnginePage
+except Exception:
+    try:
+        from PyQt5.QtWebEngineWidgets import QWebEngineProfile, QWebEnginePage
+    except Exception:
+        QWebEngineProfile = QWebEnginePage = None
+
 SearchResults = Generator[SearchResult, None, None]
 
 
+def _shared(name: str):
+    """
+    Plugin attribute stored on the shared StoreService.
+    """
+    return property(lambda self: getattr(self.service, name), lambda self, value: setattr(self.service, name, value))
+
+
+class _SearchAhead:
+    """
+    Runs `search(term)` for upcoming terms on a few threads while the caller consumes earlier ones, so their pages
+    are fetched and parsed concurrently (within the per-host limits, and in the parse workers when those are
+    enabled). At most `2 * workers` results are kept waiting; the caller's cancellation token and priority class
+    carry over to the threads. With no workers nothing runs ahead: `get()` returns the search itself, run lazily on
+    the calling thread one term at a time.
+    """
+    def __init__(self, search, workers: int):
+        self._search = search
+        self._futures = {}
+        self._executor = None
+        if workers <= 0:
+            return
+        token = current_token()
+        level = current_priority()
+
+        def run(term):
+            with priority(level):
+                return list(search(term))
+
+        self._run = token.bind(run) if token is not None else run
+        self._limit = 2 * workers
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def prefetch(self, terms):
+        if self._executor is None:
+            return
+        for term in terms:
+            if len(self._futures) >= self._limit:
+                return
+            if term not in self._futures:
+                self._futures[term] = self._executor.submit(self._run, term)
+
+    def get(self, term):
+        if self._executor is None:
+            return self._search(term)
+        future = self._futures.pop(term, None) or self._executor.submit(self._run, term)
+        return future.result()
+
+    def close(self):
+        if self._executor is None:
+            return
+        for future in self._futures.values():
+            future.cancel()
+        self._executor.shutdown(wait=False)
+
+
+class _SearchDialogWatch(QObject):
+    """
+    Cancels the searches started from a dialog once that dialog closes. calibre runs store searches on several
+    threads at once and only stops reading their generators when its search dialog goes away, so a search blocked
+    in a request would otherwise run on until its timeout. Created on the GUI thread; `watch()` may be called from
+    any thread.
+    """
+    _started = pyqtSignal(object)
+
+    def __init__(self):
+        super().__init__()
+        self._tokens = {}
+        self._started.connect(self._attach)
+
+    def watch(self, token):
+        self._started.emit(token)
+
+    def _attach(self, token):
+        dialog = QApplication.activeModalWidget() or QApplication.activeWindow()
+        if token.cancelled or not isinstance(dialog, QDialog) or not dialog.isVisible():
+            return
+        key = id(dialog)
+        tokens = self._tokens.get(key)
+        if tokens is None:
+            tokens = self._tokens[key] = []
+            dialog.finished.connect(partial(self._close, key))
+            dialog.destroyed.connect(partial(self._close, key))
+        # Searches that ended have cancelled their own token already.
+        tokens[:] = [t for t in tokens if not t.cancelled]
+        tokens.append(token)
+
+    def _close(self, key, *args):
+        for token in self._tokens.pop(key, ()):
+            token.cancel()
+
+
+class _UnreadablePage(Exception):
+    pass
+
+
+LOCAL_QUERY = re.compile(r'\s*local:\s*(.*)', re.IGNORECASE | re.DOTALL)
+MD5_QUERY = re.compile(r'\s*md5:\s*(.+)', re.IGNORECASE | re.DOTALL)
+MD5 = re.compile(r'[0-9a-f]{32}')
+
+
 class AnnasArchiveStore(StorePlugin):
     MIRRORS_MIGRATION_KEY = 'mirrors_migrated_0_4_9'
+    WARM_MIRRORS = 2
+    # Searches of ISBN-list and Bookworm runs that are fetched and parsed ahead of the one being consumed, when parse
+    # offloading is enabled; otherwise they run one at a time.
+    SEARCH_AHEAD = 4
+
+    # Warm state lives in the process-wide service so it survives the wrapper reloading this object.
+    working_mirror = _shared('working_mirror')
+    _sidebar_windows = _shared('sidebar_windows')
+    _wanted_index = _shared('wanted_index')
+    _wanted_index_lock = _shared('wanted_index_lock')
+    _background_executor = _shared('background_executor')
+    _download_executor = _shared('download_executor')
+    _traces = _shared('traces')
+    _rate_limiter = _shared('rate_limiter')
+    _detail_pages = _shared('detail_pages')
+    _inline_store = _shared('inline_store')
+    _availability_store = _shared('availability_store')
+    _availability_scanner = _shared('availability_scanner')
+    _search_watch = _shared('search_watch')
+    _stall_watchdog = _shared('stall_watchdog')
+    _stall_timer = _shared('stall_timer')
 
     def __init__(self, gui, name, config=None, base_plugin=None):
         super().__init__(gui, name, config, base_plugin)
-        self.working_mirror = None
-        # Keep references to detached sidebars so they are not GC'd.
-        self._sidebar_windows = []
+        self.service = shared_service()
+        # Hot paths read settings from this snapshot; the settings dialog invalidates it after saving.
+        self.settings = self.service.attach(self.config)
+        if self._search_watch is None:
+            self._search_watch = _SearchDialogWatch()
+        self.apply_diagnostics()
+        self._warm_mirrors()
 
     @staticmethod
     def _normalize_mirrors(mirrors):
@@ -66,13 +217,16 @@ class AnnasArchiveStore(StorePlugin):
         return ordered
 
     def get_mirrors(self):
-        mirrors = self._normalize_mirrors(self.config.get('mirrors', ()))
+        return list(self.settings.derived('mirrors', self._load_mirrors))
+
+    def _load_mirrors(self):
+        mirrors = self._normalize_mirrors(self.settings.get('mirrors', ()))
         if not mirrors:
             mirrors = list(DEFAULT_MIRRORS)
 
         # One-time migration so existing installs automatically include newly
         # added defaults (users can still edit/remove mirrors afterward).
-        if not self.config.get(self.MIRRORS_MIGRATION_KEY, False):
+        if not self.settings.get(self.MIRRORS_MIGRATION_KEY, False):
             known = set(mirrors)
             changed = False
             for mirror in DEFAULT_MIRRORS:
@@ -80,73 +234,203 @@ class AnnasArchiveStore(StorePlugin):
                     mirrors.append(mirror)
                     known.add(mirror)
                     changed = True
-            if changed or 'mirrors' not in self.config:
-                self.config['mirrors'] = mirrors
-            self.config[self.MIRRORS_MIGRATION_KEY] = True
+            if changed or 'mirrors' not in self.settings:
+                self.settings.set_runtime('mirrors', list(mirrors))
+            self.settings.set_runtime(self.MIRRORS_MIGRATION_KEY, True)
+
+        return tuple(mirrors)
 
-        return mirrors
+    def _parse(self, parser, raw: bytes):
+        """
+        Run one of the `parsing` functions, in a worker process when parse offloading is enabled.
+        """
+        if not self.settings.get('performance', {}).get('parse_offload', False):
+            return parser(raw)
+        return self.service.lazy('parse_pool', ParsePool).parse(parser, raw)
+
+    def _search_ahead(self) -> int:
+        """
+        Number of searches ISBN-list and Bookworm runs keep in flight ahead of the one being consumed.
+        """
+        return self.SEARCH_AHEAD if self.settings.get('performance', {}).get('parse_offload', False) else 0
+
+    @staticmethod
+    def _result_from_row(row, md5: Optional[str] = None) -> SearchResult:
+        """
+        SearchResult of a parsed search row, or of a detail page's row together with the `md5` it was fetched for.
+        """
+        s = SearchResult()
+        s.detail_item = md5 if md5 is not None else row.md5
+        s.cover_url = row.cover_url
+        s.title = row.title
+        s.author = row.author
+        s.formats = row.formats
+        s.price = '$0.00'
+        s.drm = SearchResult.DRM_UNLOCKED
+        return s
 
     def _search(self, url: str, max_results: int, timeout: int) -> SearchResults:
-        br = browser()
-        doc = None
         counter = max_results
+        flight = self.service.flight('search')
 
         for page in range(1, ceil(max_results / RESULTS_PER_PAGE) + 1):
-            mirrors = list(self.get_mirrors())
-            if self.working_mirror is not None:
-                if self.working_mirror in mirrors:
-                    mirrors.remove(self.working_mirror)
-                mirrors.insert(0, self.working_mirror)
-            for mirror in mirrors:
-                with closing(br.open(url.format(base=mirror, page=page), timeout=timeout)) as resp:
-                    if resp.code < 500 or resp.code > 599:
-                        self.working_mirror = mirror
-                        doc = html.fromstring(resp.read())
-                        break
-            if doc is None:
-                self.working_mirror = None
-                raise Exception('No working mirrors of Anna\'s Archive found.')
-
-            books = doc.xpath('//table/tr')
-            for book in books:
+            # Keyed without the mirror, so identical searches running concurrently share one fetch. The priority
+            # class is part of the key so an interactive search never waits behind a background one.
+            key = (current_priority(), url.format(base='', page=page))
+            rows = flight.do(key, lambda: self._fetch_search_page(url, page, timeout))
+            for row in rows:
                 if counter <= 0:
                     break
+                counter -= 1
+                yield self._result_from_row(row)
 
-                columns = book.findall("td")
-                s = SearchResult()
+    def _fetch_search_page(self, url: str, page: int, timeout: int):
+        """
+        Parsed rows of results page `page` of the search `url` template, from the first mirror that answers.
+        """
+        raw = None
+        mirrors = list(self.get_mirrors())
+        if self.working_mirror is not None:
+            if self.working_mirror in mirrors:
+                mirrors.remove(self.working_mirror)
+            mirrors.insert(0, self.working_mirror)
+        for mirror in mirrors:
+            page_url = url.format(base=mirror, page=page)
+            try:
+                with self._rate_limiter.request(page_url, timeout=timeout) as slot, \
+                        slot.track(self.service.urlopen(page_url, timeout=timeout)) as resp:
+                    slot.feedback(resp.code, resp.info())
+                    if resp.code < 500 or resp.code > 599:
+                        self.working_mirror = mirror
+                        raw = resp.read()
+                        break
+            except Exception as exc:
+                # Throttled or failing mirrors, and ones whose limiter would keep us waiting past the timeout, are
+                # skipped; the limiter has already backed off that host.
+                code = status_of(exc)
+                if code is None or (code != 429 and not 500 <= code <= 599):
+                    raise
+        if raw is None:
+            self.working_mirror = None
+            raise Exception('No working mirrors of Anna\'s Archive found.')
+
+        rows = self._parse(parse_search_page, raw)
+        self._record_rows(rows)
+        return rows
+
+    def _warm_mirrors(self):
+        """
+        Get DNS and TLS out of the way for the mirrors the first search will try.
+        """
+        mirrors = self.get_mirrors()
+        if self.working_mirror in mirrors:
+            mirrors.remove(self.working_mirror)
+            mirrors.insert(0, self.working_mirror)
+        self.service.warm(mirrors[:self.WARM_MIRRORS])
 
-                cover = columns[0].xpath('./a[@tabindex="-1"]')
-                if cover:
-                    cover = cover[0]
-                else:
-                    continue
-                s.detail_item = cover.get('href', '').split('/')[-1]
-                if not s.detail_item:
-                    continue
+    def apply_diagnostics(self):
+        """
+        Start or stop the GUI stall watchdog according to the settings. Must be called from the GUI thread.
+        """
+        perf_cfg = self.settings.get('performance', {})
+        if not perf_cfg.get('stall_watchdog', False):
+            if self._stall_watchdog is not None:
+                self._stall_timer.stop()
+                self._stall_watchdog.stop()
+                self._stall_watchdog = self._stall_timer = None
+            return
+        threshold = max(50, int(perf_cfg.get('stall_threshold_ms', 250))) / 1000
+        if self._stall_watchdog is None:
+            from calibre.constants import config_dir
+            self._stall_watchdog = StallWatchdog(
+                os.path.join(config_dir, 'plugins', 'store_annas_archive_stalls.log'), threshold, self._traces,
+                self.service.counters)
+            self._stall_timer = QTimer()
+            self._stall_timer.timeout.connect(self._stall_watchdog.beat)
+        self._stall_watchdog.threshold = threshold
+        self._stall_timer.start(int(self._stall_watchdog.beat_interval * 1000))
+        self._stall_watchdog.start()
+
+    def _local_index(self):
+        """
+        Local index of every parsed search row, or None when it is disabled or cannot be opened.
+        """
+        if not self.settings.get('local_index', {}).get('enabled', False):
+            return None
+        from calibre.constants import config_dir
+        path = os.path.join(config_dir, 'plugins', 'store_annas_archive_index.sqlite')
+        try:
+            return self.service.lazy('local_index', lambda: LocalIndex(path))
+        except Exception:
+            return None
 
-                s.cover_url = ''.join(cover.xpath('(./span/img/@src)[1]'))
-                s.title = ''.join(columns[1].xpath('./a/span/text()'))
-                s.author = ''.join(columns[2].xpath('./a/span/text()'))
-                s.formats = ''.join(columns[9].xpath('./a/span/text()')).upper()
+    def _record_rows(self, rows):
+        index = self._local_index()
+        if index is None:
+            return
+        try:
+            index.record(rows)
+        except Exception:
+            # The index is a cache; a failed write must never break a search.
+            pass
 
-                s.price = '$0.00'
-                s.drm = SearchResult.DRM_UNLOCKED
+    def _search_local(self, query: str, max_results: int, explicit: bool = False) -> SearchResults:
+        """
+        Results for `query` from the local index. An `explicit` (`local:`) search raises when the index cannot answer,
+        so that it is not mistaken for an empty result; the hybrid listing stays silent.
+        """
+        index = self._local_index()
+        if index is None:
+            if not explicit:
+                return
+            if not self.settings.get('local_index', {}).get('enabled', False):
+                raise Exception('The local index is disabled. Enable it in the plugin settings to search with local:.')
+            raise Exception('The local index could not be opened.')
+        try:
+            rows = index.search(query, max_results)
+        except Exception as exc:
+            if not explicit:
+                return
+            raise Exception(f'Searching the local index failed: {exc}') from exc
+        for row in rows:
+            yield self._result_from_row(row)
 
-                counter -= 1
-                yield s
+    def _search_url_template(self, term: str) -> str:
+        """
+        Search url for `term` with the configured search options; `{base}` and `{page}` are left to be filled in.
+        """
+        search_opts = self.settings.get('search', {})
+        url = f'{{base}}/search?page={{page}}&q={quote_plus(term)}&display=table'
+        for option in SearchOption.options:
+            value = search_opts.get(option.config_option, ())
+            if isinstance(value, str):
+                value = (value,)
+            for item in value:
+                url += f'&{option.url_param}={item}'
+        return url
 
     def search(self, query, max_results=10, timeout=60) -> SearchResults:
-        search_opts = self.config.get('search', {})
-
-        def build_url(term: str) -> str:
-            url = f'{{base}}/search?page={{page}}&q={quote_plus(term)}&display=table'
-            for option in SearchOption.options:
-                value = search_opts.get(option.config_option, ())
-                if isinstance(value, str):
-                    value = (value,)
-                for item in value:
-                    url += f'&{option.url_param}={item}'
-            return url
+        # Everything the search starts stops as soon as its generator is closed or abandoned, or the dialog it was
+        # started from closes. Other searches, including concurrent ones for the same query, are left running.
+        token = CancelToken()
+        if self._search_watch is not None:
+            self._search_watch.watch(token)
+        return cancellable(self._run_search(query, max_results, timeout), token)
+
+    def _run_search(self, query, max_results=10, timeout=60) -> SearchResults:
+        build_url = self._search_url_template
+
+        # `local:<terms>` answers from the local index of previously seen results, without the network.
+        local_query = LOCAL_QUERY.fullmatch(query)
+        if local_query:
+            yield from self._search_local(local_query.group(1), max_results, explicit=True)
+            return
+
+        # `md5:<hash>[,<hash>...]` goes straight to the book pages instead of searching.
+        md5_query = MD5_QUERY.fullmatch(query)
+        if md5_query:
+            yield from self._search_md5s(md5_query.group(1), max_results, timeout)
+            return
 
         # Special query to pull Bookworm wanted list and search for the first match of each item.
         if self._is_bookworm_query(query):
@@ -158,7 +442,9 @@ class AnnasArchiveStore(StorePlugin):
             return
 
         # Allow searching a list of ISBNs (comma or newline separated). If the query looks like a
-        # list of ISBN-like tokens, issue sequential searches and stop after max_results.
+        # list of ISBN-like tokens, search them a few at a time and stop after max_results.
+        # ISBN-10s and ISBN-13s are mapped to one canonical ISBN-13, and tokens failing their
+        # checksum are dropped before any request is made.
         raw_terms = [q.strip() for q in re.split(r'[,\n]+', query) if q.strip()]
         terms = []
         seen = set()
@@ -167,26 +453,124 @@ class AnnasArchiveStore(StorePlugin):
                 seen.add(term)
                 terms.append(term)
 
-        isbn_list = len(terms) > 1 and all(re.fullmatch(r'[0-9Xx-]+', term) for term in terms)
+        isbn_list = len(terms) > 1 and all(is_isbn_like(term) for term in terms)
+        if isbn_list:
+            terms = canonical_isbns(terms)
+            # When every token fails its checksum, search the query as typed rather than return nothing.
+            isbn_list = bool(terms)
 
         if isbn_list:
             remaining = max_results
-            for term in terms:
-                if remaining <= 0:
-                    break
-                for result in self._search(build_url(term), remaining, timeout):
-                    remaining -= 1
-                    yield result
+            # Results still come in list order; with parse offloading the searches of the next ISBNs run while they
+            # are consumed. Each asks for no more than the results still missing when it starts.
+            with closing(_SearchAhead(lambda term: self._search(build_url(term), remaining, timeout),
+                                      self._search_ahead())) as ahead:
+                for i, term in enumerate(terms):
+                    if remaining <= 0:
+                        break
+                    ahead.prefetch(terms[i:])
+                    for result in ahead.get(term):
+                        if remaining <= 0:
+                            break
+                        remaining -= 1
+                        yield result
+            return
+
+        url = build_url(canonical_isbn(query) or query)
+        if not self.settings.get('local_index', {}).get('hybrid', False):
+            yield from self._search(url, max_results, timeout)
+            return
+
+        # Hybrid mode: known matches appear at once, then remote results stream in without duplicates.
+        seen = set()
+        for result in self._search_local(query, max_results):
+            seen.add(result.detail_item)
+            yield result
+        remaining = max_results - len(seen)
+        if remaining <= 0:
+            return
+        for result in self._search(url, max_results, timeout):
+            if result.detail_item in seen:
+                continue
+            seen.add(result.detail_item)
+            yield result
+            remaining -= 1
+            if remaining <= 0:
+                return
+
+    def _detail_page(self, md5: str, timeout: int) -> bytes:
+        raw = self._detail_pages.get(md5)
+        if raw is None:
+            raw = self.service.flight('detail_page').do(md5, lambda: self._fetch_detail_page(md5, timeout))
+        return raw
+
+    def _fetch_detail_page(self, md5: str, timeout: int) -> bytes:
+        if self.working_mirror is None:
+            self.working_mirror = self.get_mirrors()[0]
+        raw, _ = self._fetch_page(self._get_url(md5), timeout)
+        self._detail_pages.put(md5, raw)
+        return raw
+
+    def _lookup_md5(self, md5: str, timeout: int) -> Optional[SearchResult]:
+        """
+        Result for `md5`, or None when Anna's Archive has no such file. Raises _UnreadablePage when its page cannot be
+        parsed, and network failures as they are.
+        """
+        try:
+            raw = self._detail_page(md5, timeout)
+        except HTTPError as exc:
+            if exc.code == 404:
+                return None
+            raise
+        try:
+            row = self._parse(parse_detail_page, raw)
+        except Exception as exc:
+            raise _UnreadablePage(f'Could not read the Anna\'s Archive page of {md5}') from exc
+        return self._result_from_row(row, md5)
+
+    def _search_md5s(self, hashes: str, max_results: int, timeout: int) -> SearchResults:
+        md5s = []
+        for token in re.split(r'[\s,]+', hashes.lower()):
+            if MD5.fullmatch(token) and token not in md5s:
+                md5s.append(token)
+        md5s = md5s[:max_results]
+        if not md5s:
             return
 
-        url = build_url(query)
-        yield from self._search(url, max_results, timeout)
+        # Detail pages are fetched concurrently (within the per-host limits) but yielded in query order.
+        cancel_token = current_token()
+        lookup = cancel_token.bind(self._lookup_md5) if cancel_token is not None else self._lookup_md5
+        # Unknown books and unreadable pages are skipped. A failed request does not hide the books that were found,
+        # but is raised once they have been yielded, so an outage is not mistaken for "no results"; so is an
+        # unreadable page when nothing could be read at all.
+        error = unreadable = None
+        found = False
+        with ThreadPoolExecutor(max_workers=min(4, len(md5s))) as executor:
+            futures = [executor.submit(lookup, md5, timeout) for md5 in md5s]
+            for future in futures:
+                try:
+                    result = future.result()
+                except Cancelled:
+                    return
+                except _UnreadablePage as exc:
+                    unreadable = unreadable or exc
+                    continue
+                except Exception as exc:
+                    error = error or exc
+                    continue
+                if result is not None:
+                    found = True
+                    yield result
+        if error is not None:
+            raise error
+        if unreadable is not None and not found:
+            raise unreadable
 
     def _is_bookworm_query(self, query: str) -> bool:
         """
         Users can type `bookworm:wanted` in the store search bar to fetch their Bookworm wanted list.
         """
-        if not self.config.get('bookworm', {}).get('enabled', False):
+        if not self.settings.get('bookworm', {}).get('enabled', False):
             return False
         normalized = query.strip().lower()
         return normalized in {'bookworm:wanted', 'bookworm wanted', 'bw:wanted', ':wanted'}
@@ -195,13 +579,13 @@ class AnnasArchiveStore(StorePlugin):
         """
         Users can type `bookworm:pick` to open a picker list and choose which wanted item to search.
         """
-        if not self.config.get('bookworm', {}).get('enabled', False):
+        if not self.settings.get('bookworm', {}).get('enabled', False):
             return False
         normalized = query.strip().lower()
         return normalized in {'bookworm:pick', 'bookworm:list', 'bw:pick', ':pick'}
 
-    def _fetch_bookworm_wanted(self, timeout: int):
-        cfg = self.config.get('bookworm', {})
+    def _fetch_bookworm_wanted(self, timeout: int, on_batch=None):
+        cfg = self.settings.get('bookworm', {})
         base = cfg.get('base_url', '').strip().rstrip('/')
         if not base:
             raise Exception('Bookworm base URL is not configured.')
@@ -212,29 +596,21 @@ class AnnasArchiveStore(StorePlugin):
         if token:
             headers['Authorization'] = f'Bearer {token}'
 
+        # Items are decoded a chunk at a time as they arrive, so the response text is never held in full; memory is
+        # dominated by the decoded items either way. Lists that arrive sorted are handed to `on_batch` as they are
+        # decoded and need no sort.
         try:
-            with urlopen(Request(url, headers=headers), timeout=timeout) as resp:
-                payload = json.load(resp)
-        except (HTTPError, URLError, TimeoutError, RemoteDisconnected) as exc:
+            with self._rate_limiter.request(url, timeout=timeout) as slot, \
+                    slot.track(self.service.urlopen(Request(url, headers=headers), timeout=timeout)) as resp:
+                return ingest_wanted(resp, on_batch=on_batch)
+        except (HTTPError, URLError, TimeoutError, RemoteDisconnected, Throttled) as exc:
             raise Exception(f'Failed to fetch Bookworm wanted list: {exc}')
-
-        items = payload.get('items', [])
-        if not isinstance(items, list):
-            raise Exception('Bookworm response did not include an \"items\" list.')
-        def sort_key(item):
-            title = str(item.get('title') or '').strip().lower()
-            authors = item.get('authors') or []
-            first_author = str(authors[0]).strip().lower() if authors else ''
-            return (title, first_author)
-        return sorted(items, key=sort_key)
+        except ValueError as exc:
+            raise Exception(f'Invalid Bookworm wanted list: {exc}')
 
     @staticmethod
     def _bookworm_terms(item):
-        terms = []
-        for isbn in item.get('isbns') or ():
-            cleaned = isbn.replace('-', '').strip()
-            if cleaned and cleaned not in terms:
-                terms.append(cleaned)
+        terms = canonical_isbns(str(isbn) for isbn in item.get('isbns') or ())
 
         title = item.get('title', '').strip()
         authors = item.get('authors') or []
@@ -244,6 +620,22 @@ class AnnasArchiveStore(StorePlugin):
             terms.append(title)
         return terms
 
+    def _build_bookworm_index(self, items):
+        version = wanted_list_version(items)
+        with self._wanted_index_lock:
+            if self._wanted_index is not None and self._wanted_index[0] == version:
+                return self._wanted_index[1]
+        index = WantedIndex(items)
+        with self._wanted_index_lock:
+            self._wanted_index = (version, index)
+        return index
+
+    def _bookworm_index(self, items):
+        """
+        Future resolving to the filter index of `items`; it is only rebuilt when the wanted list changes.
+        """
+        return self._background_executor.submit(self._build_bookworm_index, items)
+
     def _pick_bookworm_item(self, items):
         if not items:
             return None
@@ -253,18 +645,23 @@ class AnnasArchiveStore(StorePlugin):
         layout = QVBoxLayout(dlg)
         layout.addWidget(QLabel('Pick a wanted book to search on Anna\'s Archive'))
 
+        filter_edit = QLineEdit(dlg)
+        filter_edit.setPlaceholderText('Filter by title, author or ISBN')
+        filter_edit.setClearButtonEnabled(True)
+        layout.addWidget(filter_edit)
+
+        if not isinstance(items, WantedList):
+            items = WantedList(items)
         list_widget = QListWidget(dlg)
-        for item in items:
-            title = item.get('title', '(untitled)')
-            authors = ', '.join(item.get('authors') or [])
-            display = f'{title} | {authors}' if authors else title
-            lw_item = QListWidgetItem(display)
-            lw_item.setData(Qt.ItemDataRole.UserRole, self._bookworm_terms(item))
-            list_widget.addItem(lw_item)
+        # Rows map to items by position; terms are only worked out for the picked one.
+        list_widget.setUniformItemSizes(True)
+        list_widget.addItems(items.displays)
         list_widget.setMinimumWidth(520)
         list_widget.setMinimumHeight(320)
         list_widget.setCurrentRow(0)
         layout.addWidget(list_widget)
+        list_filter = WantedListFilter(self, filter_edit, list_widget)
+        list_filter.set_items(items)
 
         btn_row = QHBoxLayout()
         btn_row.addStretch(1)
@@ -282,22 +679,27 @@ class AnnasArchiveStore(StorePlugin):
             return None
 
         item = list_widget.currentItem()
+        if item is None or item.isHidden():
+            item = list_filter.first_visible()
         if not item:
             return None
-        return item.data(Qt.ItemDataRole.UserRole)
+        return self._bookworm_terms(items[list_widget.row(item)])
 
     # --- Sidebar helpers ---
 
     def _maybe_show_bookworm_sidebar(self, dialog):
-        bookworm_cfg = self.config.get('bookworm', {})
+        bookworm_cfg = self.settings.get('bookworm', {})
         if not (bookworm_cfg.get('enabled') and bookworm_cfg.get('sidebar', True)):
             return
         try:
             items = self._fetch_bookworm_wanted(timeout=15)
         except Exception:
             return
+        availability = self._availability()
+        if availability is not None:
+            self._availability_scanner.update_items(items)
         # Use a detached sidebar to avoid Qt binding mismatches; keep a strong ref.
-        sidebar = BookwormSidebar(self, dialog, items, self._navigate_store_from_sidebar)
+        sidebar = BookwormSidebar(self, dialog, items, self._navigate_store_from_sidebar, availability)
         self._sidebar_windows.append(sidebar)
         try:
             sidebar.destroyed.connect(lambda: self._sidebar_windows.remove(sidebar) if sidebar in self._sidebar_windows else None)  # type: ignore[attr-defined]
@@ -314,14 +716,28 @@ class AnnasArchiveStore(StorePlugin):
     def _navigate_store_from_sidebar(self, dialog, terms):
         if not terms:
             return
+        if self.settings.get('ui', {}).get('native_results', False) and QWebEngineView is not None:
+            # Render the parsed search rows natively instead of loading the full search page.
+            try:
+                store = dialog if isinstance(dialog, InlineStoreDialog) else self._inline_store_dialog()
+                store.show_results(terms)
+                self._run_inline_store(store, dialog)
+                return
+            except Exception:
+                pass
         search_url = self._build_sidebar_search_url(terms[0])
         if not search_url:
             return
-        # Try to load in the inline view first.
+        # Try to load in the inline view first, reusing the warm store window when the sidebar is detached.
         try:
             if hasattr(dialog, 'view'):
                 dialog.view.load(QUrl(search_url))
                 return
+            if QWebEngineView is not None:
+                store = self._inline_store_dialog()
+                store.navigate(search_url)
+                self._run_inline_store(store, dialog)
+                return
         except Exception:
             pass
 
@@ -331,7 +747,7 @@ class AnnasArchiveStore(StorePlugin):
         try:
             d = WebStoreDialog(self.gui, self.working_mirror, dialog or self.gui, search_url)
             d.setWindowTitle(self.name)
-            d.set_tags(self.config.get('tags', ''))
+            d.set_tags(self.settings.get('tags', ''))
             d.exec()
             return
         except Exception:
@@ -341,62 +757,163 @@ class AnnasArchiveStore(StorePlugin):
         open_url(QUrl(search_url))
 
     def _build_sidebar_search_url(self, term: str) -> str:
-        search_opts = self.config.get('search', {})
         base = self.working_mirror or self.get_mirrors()[0]
-        url = f'{base}/search?page=1&q={quote_plus(term)}&display=table'
-        for option in SearchOption.options:
-            value = search_opts.get(option.config_option, ())
-            if isinstance(value, str):
-                value = (value,)
-            for item in value:
-                url += f'&{option.url_param}={item}'
-        return url
+        return self._search_url_template(term).format(base=base, page=1)
+
+    def _availability(self):
+        """
+        Availability store for sidebar badges; the background scanner is started with it when enabled.
+        """
+        bookworm_cfg = self.settings.get('bookworm', {})
+        if not (bookworm_cfg.get('enabled') and bookworm_cfg.get('scan', False)):
+            if self._availability_scanner is not None:
+                self._availability_scanner.stop()
+                self._availability_scanner = None
+            return None
+        if self._availability_store is None:
+            self._availability_store = AvailabilityStore()
+        if self._availability_scanner is None or not self._availability_scanner.is_alive():
+            self._availability_scanner = AvailabilityScanner(
+                self, self._availability_store, lambda: self._fetch_bookworm_wanted(timeout=30)
+            )
+            self._availability_scanner.start()
+        return self._availability_store
+
+    def _cover_cache(self):
+        return self.service.lazy('covers', lambda: CoverCache(self._fetch_cover))
+
+    def _fetch_cover(self, url: str) -> bytes:
+        with self._rate_limiter.request(url, PREFETCH, timeout=15), self.service.urlopen(url, timeout=15) as resp:
+            return resp.read()
+
+    def download_verified(self, url: str, path: str, md5: str, cookies=None, user_agent=None):
+        """
+        Start a segmented, resumable download of `url` to `path` in the background and return the
+        (SegmentedDownload, Future) pair. The future fails with ChecksumMismatch if the file is not the book `md5`,
+        and with NotAFile if the host answers with a page; `cookies` and `user_agent` are those of the web view the
+        download was started from, so hosts see the same session.
+        """
+        headers = self.service.headers()
+        if user_agent:
+            headers = {name: value for name, value in headers.items() if name.lower() != 'user-agent'}
+            headers['User-Agent'] = user_agent
+        download = SegmentedDownload(url, path, md5, limiter=self._rate_limiter, headers=headers,
+                                     opener=self.service.urlopen, cookies=cookies)
+        return download, self._download_executor.submit(download.run)
+
+    def _inline_store_dialog(self):
+        # A reloaded plugin object keeps using the same window unless calibre's main window changed.
+        if self._inline_store is not None and self._inline_store.home is not self.gui:
+            old, self._inline_store = self._inline_store, None
+            old.dispose()
+        if self._inline_store is None:
+            self._inline_store = InlineStoreDialog(self, self.gui, self._navigate_store_from_sidebar)
+        return self._inline_store
+
+    def _run_inline_store(self, dlg, parent):
+        """
+        Show the reused store window modally to `parent`, like a freshly created dialog would be. calibre's Get Books
+        dialog is itself modal, so a window it did not open could not receive input. When the window is already open
+        it is only raised.
+        """
+        if dlg.isVisible():
+            dlg.present()
+            return
+        dlg.attach(parent if isinstance(parent, QWidget) else self.gui)
+        try:
+            dlg.exec()
+        finally:
+            # Closing only hides the window; it goes back under the main window so it outlives `parent`.
+            dlg.attach(self.gui)
 
     def _open_inline_store(self, url: str, parent) -> bool:
         """
         Try to show the store (and Bookworm sidebar, if enabled) in one window
         using a Qt WebEngine view. Falls back to the default WebStoreDialog if
-        WebEngine is unavailable.
+        WebEngine is unavailable. The window is reused across opens and the
+        wanted list is refreshed in the background.
         """
         if QWebEngineView is None:
             return False
 
-        bookworm_cfg = self.config.get('bookworm', {})
+        bookworm_cfg = self.settings.get('bookworm', {})
         show_sidebar = bookworm_cfg.get('enabled', False) and bookworm_cfg.get('sidebar', True)
 
         try:
-            items = self._fetch_bookworm_wanted(timeout=15) if show_sidebar else []
-        except Exception:
-            items = []
-
-        try:
-            dlg = InlineStoreDialog(self, parent or self.gui, url, items, show_sidebar, self._navigate_store_from_sidebar)
+            dlg = self._inline_store_dialog()
+            dlg.configure(show_sidebar, self._availability() if show_sidebar else None)
         except Exception:
             return False
-        dlg.exec()
+        dlg.navigate(url)
+        if show_sidebar:
+            self._refresh_inline_sidebar(dlg)
+        self._run_inline_store(dlg, parent)
         return True
 
-    def _search_bookworm_wanted(self, build_url, max_results: int, timeout: int) -> SearchResults:
-        wanted_items = self._fetch_bookworm_wanted(timeout)
-        remaining = max_results
+    def _refresh_inline_sidebar(self, dlg, poll_ms=100):
+        # Batches of a sorted list are shown while the rest is still downloading, one per event-loop turn.
+        batches = queue.Queue()
+        future = self._background_executor.submit(
+            self._fetch_bookworm_wanted, 15, lambda items, displays: batches.put((items, displays)))
+        streamed = False
 
-        for item in wanted_items:
-            if remaining <= 0:
-                break
+        def deliver():
+            nonlocal streamed
+            if future.done():
+                try:
+                    items = future.result()
+                except Exception:
+                    if streamed:
+                        # Part of a list is worse than none; the sidebar only streams when it was empty.
+                        dlg.set_items(WantedList())
+                    return
+                if self._availability_scanner is not None:
+                    self._availability_scanner.update_items(items)
+                dlg.set_items(items)
+                return
+            try:
+                batch = batches.get_nowait()
+            except queue.Empty:
+                QTimer.singleShot(poll_ms, deliver)
+                return
+            streamed = dlg.stream_items(*batch) or streamed
+            QTimer.singleShot(0, deliver)
 
-            terms = self._bookworm_terms(item)
+        QTimer.singleShot(poll_ms, deliver)
 
-            found = False
-            for term in terms:
-                for result in self._search(build_url(term), 1, timeout):
-                    remaining -= 1
-                    found = True
-                    yield result
-                    break
+    def _search_bookworm_wanted(self, build_url, max_results: int, timeout: int) -> SearchResults:
+        wanted_items = self._fetch_bookworm_wanted(timeout)
+        remaining = max_results
+        # Wanted items often share ISBNs or titles; each term is searched once per run.
+        searched = {}
+        yielded = set()
+
+        def upcoming(start):
+            # The first term of the next items is the one most likely to be needed.
+            for item in wanted_items[start:start + workers * 2]:
+                terms = self._bookworm_terms(item)
+                if terms and terms[0] not in searched:
+                    yield terms[0]
+
+        workers = self._search_ahead()
+        with closing(_SearchAhead(lambda term: self._search(build_url(term), 1, timeout), workers)) as ahead:
+            for i, item in enumerate(wanted_items):
                 if remaining <= 0:
                     break
-                if found:
-                    break
+                ahead.prefetch(upcoming(i))
+
+                for term in self._bookworm_terms(item):
+                    if term not in searched:
+                        searched[term] = None
+                        for result in ahead.get(term):
+                            searched[term] = result.detail_item
+                            if result.detail_item not in yielded:
+                                yielded.add(result.detail_item)
+                                remaining -= 1
+                                yield result
+                            break
+                    if searched[term] is not None or remaining <= 0:
+                        break
 
     def _search_bookworm_pick(self, build_url, max_results: int, timeout: int) -> SearchResults:
         wanted_items = self._fetch_bookworm_wanted(timeout)
@@ -414,6 +931,7 @@ class AnnasArchiveStore(StorePlugin):
                 break
 
     def open(self, gui=None, parent=None, detail_item=None, external=False):
+        self._warm_mirrors()
         if detail_item:
             url = self._get_url(detail_item)
         else:
@@ -421,32 +939,39 @@ class AnnasArchiveStore(StorePlugin):
                 url = self.working_mirror
             else:
                 url = self.get_mirrors()[0]
-        if external or self.config.get('open_external', False):
+        if external or self.settings.get('open_external', False):
             open_url(QUrl(url))
         else:
             if self._open_inline_store(url, parent):
                 return
             d = WebStoreDialog(self.gui, self.working_mirror, parent, url)
             d.setWindowTitle(self.name)
-            d.set_tags(self.config.get('tags', ''))
+            d.set_tags(self.settings.get('tags', ''))
             self._maybe_show_bookworm_sidebar(d)
             d.exec()
 
     def get_details(self, search_result: SearchResult, timeout=60):
         if not search_result.formats:
             return
+        # Concurrent callers for the same book share one resolution of its links.
+        key = (search_result.detail_item, search_result.formats)
+        search_result.downloads.update(self.service.flight('details').do(
+            key, lambda: self._download_links(search_result.detail_item, search_result.formats, timeout)))
 
-        expected_ext = '.' + search_result.formats.lower()
+    def _download_links(self, md5: str, formats: str, timeout=60) -> dict:
+        """
+        Download links of the book `md5` in `formats`, keyed by "<link text>.<formats>".
+        """
+        expected_ext = '.' + formats.lower()
 
-        link_opts = self.config.get('link', {})
+        downloads = {}
+        link_opts = self.settings.get('link', {})
         url_extension = link_opts.get('url_extension', True)
         content_type = link_opts.get('content_type', False)
 
-        br = browser()
-        if self.working_mirror is None:
-            self.working_mirror = self.get_mirrors()[0]
-        with closing(br.open(self._get_url(search_result.detail_item), timeout=timeout)) as f:
-            doc = html.fromstring(f.read())
+        content_types = self.service.lazy('content_types', ContentTypeKnowledge) if content_type else None
+
+        raw = self._detail_page(md5, timeout)
 
         def has_expected_extension(url: str) -> bool:
             """
@@ -460,28 +985,28 @@ class AnnasArchiveStore(StorePlugin):
                 return True
             return url_without_params.lower().endswith(expected_ext)
 
-        for link in doc.xpath('//div[@id="md5-panel-downloads"]//a[contains(@class, "js-download-link")]'):
-            url = link.get('href')
-            if not url:
-                continue
+        for url, link_text in self._parse(parse_download_links, raw):
             # Skip AA-hosted fast/slow links that sit behind a JS challenge.
             if '/fast_download/' in url or '/slow_download/' in url:
                 continue
-            link_text = ' '.join(link.itertext()).strip()
             link_text_lower = link_text.lower()
 
-            if 'libgen.li' in link_text_lower or 'libgen.li' in url:
-                url = self._get_libgen_link(url, br)
-                link_text = link_text or 'Libgen.li'
-            elif 'libgen.rs' in link_text_lower or 'libgen.rs' in url:
-                url = self._get_libgen_nonfiction_link(url, br)
-                link_text = link_text or 'Libgen.rs'
-            elif 'sci-hub' in link_text_lower or 'scihub' in url:
-                url = self._get_scihub_link(url, br)
-                link_text = link_text or 'Sci-Hub'
-            elif 'z-library' in link_text_lower or 'zlib' in link_text_lower:
-                url = self._get_zlib_link(url, br)
-                link_text = link_text or 'Z-Library'
+            try:
+                if 'libgen.li' in link_text_lower or 'libgen.li' in url:
+                    url = self._get_libgen_link(url, timeout)
+                    link_text = link_text or 'Libgen.li'
+                elif 'libgen.rs' in link_text_lower or 'libgen.rs' in url:
+                    url = self._get_libgen_nonfiction_link(url, timeout)
+                    link_text = link_text or 'Libgen.rs'
+                elif 'sci-hub' in link_text_lower or 'scihub' in url:
+                    url = self._get_scihub_link(url, timeout)
+                    link_text = link_text or 'Sci-Hub'
+                elif 'z-library' in link_text_lower or 'zlib' in link_text_lower:
+                    url = self._get_zlib_link(url, timeout)
+                    link_text = link_text or 'Z-Library'
+            except Throttled:
+                # A host that is pausing us would only delay the other links.
+                continue
 
             if not url:
                 continue
@@ -489,50 +1014,64 @@ class AnnasArchiveStore(StorePlugin):
             if url.startswith('/'):
                 url = f"{self.working_mirror}{url}"
 
-            # Takes longer, but more accurate
+            # Takes longer, but more accurate. Hosts that reliably answer one way are not probed every time.
             if content_type:
-                try:
-                    with urlopen(Request(url, method='HEAD'), timeout=timeout) as resp:
-                        if resp.info().get_content_maintype() != 'application':
-                            continue
-                except (HTTPError, URLError, TimeoutError, RemoteDisconnected):
-                    pass
+                verdict = content_types.decide(url)
+                if verdict is None:
+                    try:
+                        with self._rate_limiter.request(url, timeout=timeout) as slot, \
+                                slot.track(self.service.urlopen(Request(url, method='HEAD'), timeout=timeout)) as resp:
+                            verdict = resp.info().get_content_maintype() == 'application'
+                        content_types.learn(url, verdict)
+                    except (HTTPError, URLError, TimeoutError, RemoteDisconnected, Throttled):
+                        pass
+                if verdict is False:
+                    continue
             elif url_extension:
                 # Speeds it up by checking the extension of the url.
                 # Might miss a direct url that doesn't end with the extension
                 if not has_expected_extension(url):
                     continue
-            search_result.downloads[f"{link_text}.{search_result.formats}"] = url
+            downloads[f"{link_text}.{formats}"] = url
 
-    @staticmethod
-    def _get_libgen_link(url: str, br) -> str:
-        with closing(br.open(url)) as resp:
-            doc = html.fromstring(resp.read())
-            scheme, _, host, _ = resp.geturl().split('/', 3)
+        if content_type:
+            content_types.flush()
+        return downloads
+
+    def _fetch_page(self, url: str, timeout=60):
+        """
+        Fetch `url` through the per-host limiter; returns the raw body and the final (redirected) url.
+        """
+        with self._rate_limiter.request(url, timeout=timeout) as slot, \
+                slot.track(self.service.urlopen(url, timeout=timeout)) as resp:
+            slot.feedback(resp.code, resp.info())
+            return resp.read(), resp.geturl()
+
+    def _open_page(self, url: str, timeout=60):
+        raw, final_url = self._fetch_page(url, timeout)
+        return html.fromstring(raw), final_url
+
+    def _get_libgen_link(self, url: str, timeout=60) -> str:
+        doc, final_url = self._open_page(url, timeout)
+        scheme, _, host, _ = final_url.split('/', 3)
         url = ''.join(doc.xpath('//a[h2[text()="GET"]]/@href'))
         return f"{scheme}//{host}/{url}"
 
-    @staticmethod
-    def _get_libgen_nonfiction_link(url: str, br) -> str:
-        with closing(br.open(url)) as resp:
-            doc = html.fromstring(resp.read())
+    def _get_libgen_nonfiction_link(self, url: str, timeout=60) -> str:
+        doc, _ = self._open_page(url, timeout)
         url = ''.join(doc.xpath('//h2/a[text()="GET"]/@href'))
         return url
 
-    @staticmethod
-    def _get_scihub_link(url, br):
-        with closing(br.open(url)) as resp:
-            doc = html.fromstring(resp.read())
-            scheme, _ = resp.geturl().split('/', 1)
+    def _get_scihub_link(self, url, timeout=60):
+        doc, final_url = self._open_page(url, timeout)
+        scheme, _ = final_url.split('/', 1)
         url = ''.join(doc.xpath('//embed[@id="pdf"]/@src'))
         if url:
             return scheme + url
 
-    @staticmethod
-    def _get_zlib_link(url, br):
-        with closing(br.open(url)) as resp:
-            doc = html.fromstring(resp.read())
-            scheme, _, host, _ = resp.geturl().split('/', 3)
+    def _get_zlib_link(self, url, timeout=60):
+        doc, final_url = self._open_page(url, timeout)
+        scheme, _, host, _ = final_url.split('/', 3)
         url = ''.join(doc.xpath('//a[contains(@class, "addDownloadedBook")]/@href'))
         if url:
             return f"{scheme}//{host}/{url}"
@@ -548,9 +1087,89 @@ class AnnasArchiveStore(StorePlugin):
         config_widget.save_settings()
 
 
+class WantedListFilter:
+    """
+    Hides the rows of a wanted-list QListWidget that do not match the text of a filter box.
+
+    Rows must be in the same order as the items the index was built from. Only rows whose visibility changes are
+    touched on each keystroke.
+    """
+    RETRY_MS = 50
+
+    def __init__(self, plugin, line_edit, list_widget):
+        self.plugin = plugin
+        self.line_edit = line_edit
+        self.list_widget = list_widget
+        self.index_future = None
+        self.visible = None
+        self.pending = None
+        line_edit.textChanged.connect(self.apply)
+
+    def reset(self):
+        """
+        Forget the index of the previous list, e.g. while the list widget is being refilled.
+        """
+        self.index_future = None
+        self.visible = None
+        self.pending = None
+
+    def set_items(self, items):
+        """
+        Index a freshly populated list and re-apply the current filter text to it.
+        """
+        self.index_future = self.plugin._bookworm_index(items)
+        self.visible = None
+        if self.line_edit.text():
+            self.apply(self.line_edit.text())
+
+    def apply(self, text):
+        if self.index_future is None:
+            return
+        if not self.index_future.done():
+            # The index is still being built off the GUI thread; apply the latest text once it is ready.
+            if self.pending is None:
+                QTimer.singleShot(self.RETRY_MS, self._apply_pending)
+            self.pending = text
+            return
+        try:
+            index = self.index_future.result()
+        except Exception:
+            return
+        visible = index.filter(text)
+        hide, show = row_changes(self.visible, visible, index.size)
+
+        self.list_widget.setUpdatesEnabled(False)
+        try:
+            for row in hide:
+                self.list_widget.setRowHidden(row, True)
+            for row in show:
+                self.list_widget.setRowHidden(row, False)
+        finally:
+            self.list_widget.setUpdatesEnabled(True)
+        self.visible = visible
+
+        current = self.list_widget.currentItem()
+        if current is None or current.isHidden():
+            first = self.first_visible()
+            if first is not None:
+                self.list_widget.setCurrentItem(first)
+
+    def _apply_pending(self):
+        text, self.pending = self.pending, None
+        if text is not None:
+            self.apply(text)
+
+    def first_visible(self):
+        if self.visible is None:
+            return self.list_widget.item(0)
+        return self.list_widget.item(self.visible[0]) if self.visible else None
+
 
 class BookwormSidebar(QWidget):
-    def __init__(self, plugin, store_dialog, items, select_callback):
+    AVAILABILITY_REFRESH_MS = 2000
+    ROW_BATCH = 500
+
+    def __init__(self, plugin, store_dialog, items, select_callback, availability=None):
         # Tie lifetime to the store dialog when possible, without triggering
         # binding mismatches on some Calibre builds.
         parent = store_dialog if isinstance(store_dialog, QDialog) else None
@@ -562,25 +1181,36 @@ class BookwormSidebar(QWidget):
             self.setWindowFlag(Qt.WindowType.WindowStaysOnTopHint)
         self.select_callback = select_callback
         self.store_dialog = store_dialog
+        self.availability = None
+        self._availability_revision = None
+        self._availability_timer = None
+        self._items = None
+        self._displays = []
+        self._keys = []
+        self._rows_by_key = {}
+        self._streamed = None
+        self._batches = None
+        self._batch_timer = QTimer(self)
+        self._batch_timer.setSingleShot(True)
+        self._batch_timer.timeout.connect(self._add_batch)
 
         layout = QVBoxLayout(self)
         layout.setContentsMargins(6, 6, 6, 6)
         layout.addWidget(QLabel('Bookworm wanted'))
 
+        self.filter_edit = QLineEdit(self)
+        self.filter_edit.setPlaceholderText('Filter by title, author or ISBN')
+        self.filter_edit.setClearButtonEnabled(True)
+        layout.addWidget(self.filter_edit)
+
         self.list_widget = QListWidget(self)
-        for item in items:
-            title = item.get('title', '(untitled)')
-            authors = ', '.join(item.get('authors') or [])
-            display = f'{title} | {authors}' if authors else title
-            lw_item = QListWidgetItem(display)
-            lw_item.setToolTip(display)
-            lw_item.setData(Qt.ItemDataRole.UserRole, item)
-            self.list_widget.addItem(lw_item)
+        self.list_widget.setUniformItemSizes(True)
         self.list_widget.itemDoubleClicked.connect(self._on_pick)
         self.list_widget.itemClicked.connect(self._on_pick)
         self.list_widget.setMinimumWidth(520)
         self.list_widget.setMinimumHeight(420)
         layout.addWidget(self.list_widget)
+        self.list_filter = WantedListFilter(plugin, self.filter_edit, self.list_widget)
 
         btns = QHBoxLayout()
         btns.addStretch(1)
@@ -594,6 +1224,9 @@ class BookwormSidebar(QWidget):
         except Exception:
             pass
 
+        self.set_items(items)
+        self.set_availability(availability)
+
         # Close automatically if the parent dialog is destroyed.
         if parent is not None:
             try:
@@ -601,52 +1234,468 @@ class BookwormSidebar(QWidget):
             except Exception:
                 pass
 
+    def set_items(self, items):
+        streamed, self._streamed = self._streamed, None
+        if streamed is None and items == self._items:
+            return
+        self._items = items if isinstance(items, WantedList) else WantedList(items)
+        self._displays = self._items.displays
+        self._keys = [wanted_item_key(item) for item in self._items]
+        self._rows_by_key = {}
+        for row, key in enumerate(self._keys):
+            self._rows_by_key.setdefault(key, []).append(row)
+        # The filter's index and hidden rows belong to the old list until the new one is fully loaded.
+        self.list_filter.reset()
+        # Rows streamed in while the list was arriving stay when the complete list starts with them.
+        kept = 0
+        if streamed is not None and len(streamed) <= len(self._items) and all(
+                a is b for a, b in zip(streamed, self._items)):
+            kept = len(streamed)
+        if not kept:
+            self.list_widget.clear()
+        # Rows are added a batch per event-loop turn so long lists never freeze the window.
+        self._batches = self._items.batches(self.ROW_BATCH, kept)
+        self._add_batch()
+
+    def stream_items(self, items, displays):
+        """
+        Show rows of a wanted list that is still arriving in sorted order; `set_items()` with the complete list
+        finishes it. Ignored while the sidebar shows an earlier list, which stays up until its replacement is
+        complete. Returns whether the rows were shown.
+        """
+        if self._streamed is None:
+            if self._items:
+                return False
+            self._streamed = self._items = WantedList()
+            self._displays = self._items.displays
+            self._batches = None
+            self._batch_timer.stop()
+            self.list_filter.reset()
+            self.list_widget.clear()
+        first = len(self._streamed)
+        self._streamed.extend(items)
+        self._displays.extend(displays)
+        self._add_rows(first, displays)
+        return True
+
+    def _add_rows(self, start, displays):
+        self.list_widget.setUpdatesEnabled(False)
+        try:
+            self.list_widget.addItems(displays)
+            for row in range(start, start + len(displays)):
+                self.list_widget.item(row).setToolTip(self._displays[row])
+        finally:
+            self.list_widget.setUpdatesEnabled(True)
+
+    def _add_batch(self):
+        if self._batches is None:
+            return
+        batch = next(self._batches, None)
+        if batch is not None:
+            self._add_rows(*batch)
+            self._batch_timer.start(0)
+            return
+        self._batches = None
+        self.list_filter.set_items(self._items)
+        self._availability_revision = None
+        if self.availability is not None:
+            self._refresh_availability()
+
+    def set_availability(self, availability):
+        self.availability = availability
+        self._availability_revision = None
+        if availability is None:
+            if self._availability_timer is not None:
+                self._availability_timer.stop()
+            return
+        self._refresh_availability()
+        if self._availability_timer is None:
+            self._availability_timer = QTimer(self)
+            self._availability_timer.timeout.connect(self._refresh_availability)
+        self._availability_timer.start(self.AVAILABILITY_REFRESH_MS)
+
+    def _refresh_availability(self):
+        if self._batches is not None or self._streamed is not None:
+            return
+        if self._availability_revision is None:
+            revision, keys = self.availability.revision, None
+        else:
+            revision, keys = self.availability.changes_since(self._availability_revision)
+            if revision == self._availability_revision:
+                return
+        self._availability_revision = revision
+        # After the first pass only the rows of items the scanner recorded since the last refresh are touched.
+        if keys is None:
+            rows = range(len(self._keys))
+        else:
+            rows = sorted({row for key in set(keys) for row in self._rows_by_key.get(key, ())})
+        for row in rows:
+            key, display = self._keys[row], self._displays[row]
+            entry = self.availability.get(key)
+            lw_item = self.list_widget.item(row)
+            if entry is None:
+                text, tooltip = display, display
+            elif entry.get('hit'):
+                formats = ', '.join(entry.get('formats') or ())
+                text = f'\u2713 {display}'
+                tooltip = f'{display}\nAvailable: {formats or "unknown format"} ({entry.get("md5")})'
+            else:
+                text, tooltip = f'\u2717 {display}', f'{display}\nNot found on Anna\'s Archive'
+            if lw_item.text() != text:
+                lw_item.setText(text)
+                lw_item.setToolTip(tooltip)
+
     def _on_pick(self, item):
         if not item:
             return
-        terms = self.plugin._bookworm_terms(item.data(Qt.ItemDataRole.UserRole))
+        terms = self.plugin._bookworm_terms(self._items[self.list_widget.row(item)])
         # Prefer the store dialog (inline or standalone) as navigation target.
         target_dialog = self.store_dialog if self.store_dialog is not None else self
         self.select_callback(target_dialog, terms)
 
 
+class NativeResultsPane(QWidget):
+    """
+    Lightweight list of parsed search rows with cached covers, used instead of loading the site's search page.
+
+    Searching runs `_search` over the wanted item's term chain on a worker thread; rows are handed over through a
+    queue that a timer drains on the GUI thread. Activating a row calls `open_callback` with its md5.
+    """
+    MAX_RESULTS = 25
+    POLL_MS = 50
+    COVER_SIZE = QSize(48, 72)
+
+    def __init__(self, plugin, parent, open_callback):
+        super().__init__(parent)
+        self.plugin = plugin
+        self.open_callback = open_callback
+        self._generation = 0
+        self._token = CancelToken()
+        self._rows = queue.Queue()
+        self._covers = []
+        self._finished = False
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.status = QLabel('', self)
+        layout.addWidget(self.status)
+        self.list_widget = QListWidget(self)
+        self.list_widget.setIconSize(self.COVER_SIZE)
+        self.list_widget.itemActivated.connect(self._on_activate)
+        self.list_widget.itemDoubleClicked.connect(self._on_activate)
+        layout.addWidget(self.list_widget)
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._drain)
+
+    def cancel(self):
+        """
+        Stop the running search, aborting its request in flight.
+        """
+        self._token.cancel()
+        if not self._finished:
+            self._finished = True
+            self.status.setText('Search stopped')
+
+    def search(self, terms):
+        self.cancel()
+        self._token = CancelToken()
+        self._generation += 1
+        generation = self._generation
+        self.list_widget.clear()
+        self._covers = []
+        self._finished = False
+        self.status.setText(f'Searching for {terms[0]}\u2026')
+        self.plugin._background_executor.submit(self._token.bind(self._run), generation, list(terms))
+        self._timer.start(self.POLL_MS)
+
+    def _run(self, generation, terms):
+        try:
+            for term in terms:
+                found = False
+                for result in self.plugin._search(self.plugin._search_url_template(term), self.MAX_RESULTS, 30):
+                    if generation != self._generation:
+                        return
+                    found = True
+                    self._rows.put((generation, result))
+                if found:
+                    break
+        except Cancelled:
+            return
+        except Exception as exc:
+            self._rows.put((generation, exc))
+            return
+        self._rows.put((generation, None))
+
+    def _drain(self):
+        while True:
+            try:
+                generation, row = self._rows.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._generation:
+                continue
+            if row is None:
+                self._finished = True
+                count = self.list_widget.count()
+                self.status.setText(f'{count} result(s)' if count else 'No results')
+            elif isinstance(row, Exception):
+                self.status.setText(f'Search failed: {row}')
+                self._finished = True
+            else:
+                self._add_row(row)
+
+        pending = []
+        for lw_item, future in self._covers:
+            if not future.done():
+                pending.append((lw_item, future))
+                continue
+            try:
+                pixmap = QPixmap()
+                if pixmap.loadFromData(future.result()):
+                    lw_item.setIcon(QIcon(pixmap))
+            except Exception:
+                pass
+        self._covers = pending
+        if self._finished and not pending:
+            self._timer.stop()
+
+    def _add_row(self, result):
+        details = ' \u00b7 '.join(part for part in (result.author, result.formats) if part)
+        lw_item = QListWidgetItem(f'{result.title}\n{details}' if details else result.title)
+        lw_item.setData(Qt.ItemDataRole.UserRole, result.detail_item)
+        lw_item.setSizeHint(QSize(0, self.COVER_SIZE.height() + 8))
+        self.list_widget.addItem(lw_item)
+        if result.cover_url:
+            self._covers.append((lw_item, self.plugin._cover_cache().fetch(result.cover_url)))
+
+    def _on_activate(self, lw_item):
+        md5 = lw_item.data(Qt.ItemDataRole.UserRole) if lw_item else None
+        if md5:
+            self.open_callback(md5)
+
+
+def _jar_cookie(cookie) -> Cookie:
+    """
+    http.cookiejar copy of a WebEngine QNetworkCookie.
+    """
+    domain = cookie.domain()
+    expires = None if cookie.isSessionCookie() else cookie.expirationDate().toSecsSinceEpoch()
+    return Cookie(
+        0, bytes(cookie.name()).decode('utf-8', 'replace'), bytes(cookie.value()).decode('utf-8', 'replace'),
+        None, False, domain, domain.startswith('.'), domain.startswith('.'), cookie.path() or '/', True,
+        cookie.isSecure(), expires, expires is None, None, None, {})
+
+
+def _store_profile(parent):
+    """
+    Named, disk-backed WebEngine profile so the store keeps its HTTP cache and cookies across opens and sessions.
+    """
+    if QWebEngineProfile is None:
+        return None
+    from calibre.constants import config_dir
+    storage = os.path.join(config_dir, 'plugins', 'store_annas_archive_web')
+    profile = QWebEngineProfile('store_annas_archive', parent)
+    profile.setPersistentStoragePath(storage)
+    profile.setCachePath(os.path.join(storage, 'cache'))
+    profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.DiskHttpCache)
+    profile.setHttpCacheMaximumSize(InlineStoreDialog.HTTP_CACHE_SIZE)
+    profile.setPersistentCookiesPolicy(QWebEngineProfile.PersistentCookiesPolicy.ForcePersistentCookies)
+    return profile
+
+
 class InlineStoreDialog(QDialog):
     """
-    Simple wrapper dialog that hosts both the Bookworm sidebar and a WebEngine view
-    so everything lives in a single window when supported.
+    Reusable window that hosts both the Bookworm sidebar and a WebEngine view so everything lives in a single
+    window when supported. The plugin creates it once; each open runs it modally to the caller and closing hides it.
     """
-    def __init__(self, plugin, parent, url, items, show_sidebar, select_callback):
+    HTTP_CACHE_SIZE = 256 * 1024 * 1024
+
+    def __init__(self, plugin, parent, select_callback):
         super().__init__(parent)
         self.plugin = plugin
+        self.select_callback = select_callback
+        # The window it belongs to between opens; each open parents it to the caller, see attach().
+        self.home = parent
         self.setWindowTitle(plugin.name)
-        ui_opts = plugin.config.get('ui', {})
-        self.close_after_download = ui_opts.get('close_after_download', False)
+        self.close_after_download = False
+        self.resize(1200, 800)
 
         layout = QVBoxLayout(self)
         layout.setContentsMargins(6, 6, 6, 6)
 
-        splitter = QSplitter(Qt.Orientation.Horizontal, self)
-        if show_sidebar:
-            self.sidebar = BookwormSidebar(plugin, self, items, select_callback)
-            splitter.addWidget(self.sidebar)
-        else:
-            self.sidebar = None
+        self.splitter = QSplitter(Qt.Orientation.Horizontal, self)
+        self.sidebar = None
 
         self.view = QWebEngineView(self)
-        self.view.load(QUrl(url))
+        self.profile = None
         try:
-            profile = self.view.page().profile()
+            self.profile = _store_profile(self)
+            if self.profile is not None:
+                self.view.setPage(QWebEnginePage(self.profile, self.view))
+        except Exception:
+            self.profile = None
+        # Copy of the profile's cookies, sent with the segmented downloads so hosts see the browser's session.
+        self._cookies = CookieJar()
+        self._user_agent = None
+        try:
+            profile = self.profile or self.view.page().profile()
             profile.downloadRequested.connect(self._on_download_requested)
+            self._user_agent = profile.httpUserAgent()
+            cookie_store = profile.cookieStore()
+            cookie_store.cookieAdded.connect(self._on_cookie_added)
+            cookie_store.cookieRemoved.connect(self._on_cookie_removed)
+            cookie_store.loadAllCookies()
         except Exception:
             pass
-        splitter.addWidget(self.view)
-        # Favor web view space; sidebar gets a smaller fraction if present.
-        splitter.setStretchFactor(0, 0 if show_sidebar else 1)
-        splitter.setStretchFactor(1 if show_sidebar else 0, 1)
+        self.results = NativeResultsPane(plugin, self, self._open_md5)
+        self.stack = QStackedWidget(self)
+        self.stack.addWidget(self.view)
+        self.stack.addWidget(self.results)
+        self.splitter.addWidget(self.stack)
+        self.splitter.setStretchFactor(0, 1)
+
+        self.back_button = QPushButton('Back to results', self)
+        self.back_button.clicked.connect(lambda: self.stack.setCurrentWidget(self.results))
+        self.back_button.hide()
+        layout.addWidget(self.back_button, 0, Qt.AlignmentFlag.AlignLeft)
+        layout.addWidget(self.splitter)
+
+        self.download_status = QLabel(self)
+        self.download_status.hide()
+        layout.addWidget(self.download_status)
+
+        self.segmented_downloads = False
+        # md5 of the last book page visited; downloads started after it are expected to be that file.
+        self._book_md5 = None
+        self.view.urlChanged.connect(self._on_url_changed)
+        # URLs the segmented engine gave up on, left to WebEngine when they are requested again.
+        self._webengine_urls = set()
+        self._downloads = []
+        self._download_timer = QTimer(self)
+        self._download_timer.setInterval(250)
+        self._download_timer.timeout.connect(self._poll_downloads)
+
+    def configure(self, show_sidebar, availability=None):
+        """
+        Apply settings that may have changed since the window was last shown.
+        """
+        ui_cfg = self.plugin.settings.get('ui', {})
+        self.close_after_download = ui_cfg.get('close_after_download', False)
+        self.segmented_downloads = ui_cfg.get('segmented_downloads', False)
+        if show_sidebar:
+            if self.sidebar is None:
+                self.sidebar = BookwormSidebar(self.plugin, self, [], self.select_callback, availability)
+                self.splitter.insertWidget(0, self.sidebar)
+                # Favor web view space; the sidebar gets a smaller fraction.
+                self.splitter.setStretchFactor(0, 0)
+                self.splitter.setStretchFactor(1, 1)
+            else:
+                self.sidebar.set_availability(availability)
+            self.sidebar.show()
+        elif self.sidebar is not None:
+            self.sidebar.hide()
+
+    def set_items(self, items):
+        if self.sidebar is not None:
+            self.sidebar.set_items(items)
+
+    def stream_items(self, items, displays):
+        return self.sidebar is not None and self.sidebar.stream_items(items, displays)
+
+    def navigate(self, url):
+        self.back_button.hide()
+        self.stack.setCurrentWidget(self.view)
+        self.view.load(QUrl(url))
 
-        layout.addWidget(splitter)
+    def show_results(self, terms):
+        self.back_button.hide()
+        self.stack.setCurrentWidget(self.results)
+        self.results.search(terms)
+
+    def _open_md5(self, md5):
+        # Only a specific book's page is worth a full web view.
+        if self.plugin.working_mirror is None:
+            self.plugin.working_mirror = self.plugin.get_mirrors()[0]
+        self.view.load(QUrl(self.plugin._get_url(md5)))
+        self.stack.setCurrentWidget(self.view)
+        self.back_button.show()
+
+    def present(self):
+        self.show()
+        self.raise_()
+        self.activateWindow()
+
+    def dispose(self):
+        """
+        Close the window and delete it, with its WebEngine page and profile, before this returns. QtWebEngine does
+        not support two live profiles on one storage path, so this must happen before a replacement is created.
+        """
+        try:
+            self.results.cancel()
+            self._download_timer.stop()
+            self.close()
+            # The page goes first: a profile must not be deleted while a page still uses it.
+            self.view.page().deleteLater()
+            self.deleteLater()
+        except RuntimeError:
+            # Already deleted along with the main window it belonged to.
+            return
+        QApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+
+    def attach(self, parent):
+        """
+        Re-parent the window to `parent`, keeping its window flags (setParent() alone would turn it into a child
+        widget).
+        """
+        if parent is not None and self.parent() is not parent:
+            self.setParent(parent, self.windowFlags())
+
+    def hideEvent(self, event):
+        # Searches for a window nobody is looking at are abandoned; downloads keep going.
+        self.results.cancel()
+        super().hideEvent(event)
+
+    def _on_cookie_added(self, cookie):
+        self._cookies.set_cookie(_jar_cookie(cookie))
+
+    def _on_cookie_removed(self, cookie):
+        try:
+            self._cookies.clear(cookie.domain(), cookie.path() or '/', bytes(cookie.name()).decode('utf-8', 'replace'))
+        except KeyError:
+            pass
+
+    def _on_url_changed(self, url):
+        match = re.search(r'/md5/([0-9a-f]{32})', url.toString())
+        if match:
+            self._book_md5 = match.group(1)
+
+    @staticmethod
+    def _download_target(download):
+        try:
+            # Qt 6 QWebEngineDownloadRequest
+            return os.path.join(download.downloadDirectory(), download.downloadFileName())
+        except AttributeError:
+            return download.path()
 
     def _on_download_requested(self, download):
+        url = download.url().toString()
+        if (self.segmented_downloads and self._book_md5 and url.startswith(('http://', 'https://'))
+                and url not in self._webengine_urls):
+            path = self._download_target(download)
+            try:
+                download.cancel()
+            except Exception:
+                pass
+            engine, future = self.plugin.download_verified(url, path, self._book_md5, self._cookies, self._user_agent)
+            self._downloads.append((engine, future, url))
+            self._download_timer.start()
+            self._poll_downloads()
+            return
+        try:
+            download.accept()
+        except Exception:
+            pass
         # Close after the first download finishes if the option is enabled.
         try:
             download.finished.connect(self._maybe_close_after_download)
@@ -663,10 +1712,36 @@ class InlineStoreDialog(QDialog):
 
     def _maybe_close_after_download(self):
         if self.close_after_download:
+            # Hiding keeps the window (and its warm WebEngine state) around for the next open.
             self.accept()
 
-    def _on_pick(self, item):
-        if not item:
-            return
-        terms = self.plugin._bookworm_terms(item.data(Qt.ItemDataRole.UserRole))
-        self.select_callback(self.store_dialog, terms)
+    def _poll_downloads(self):
+        messages = []
+        for entry in list(self._downloads):
+            engine, future, url = entry
+            name = os.path.basename(engine.path)
+            if not future.done():
+                done = engine.bytes_done / (1024 * 1024)
+                if engine.size:
+                    messages.append(f'Downloading {name}: {done:.1f} of {engine.size / (1024 * 1024):.1f} MB')
+                else:
+                    messages.append(f'Downloading {name}: {done:.1f} MB')
+                continue
+            self._downloads.remove(entry)
+            exc = future.exception()
+            if exc is None:
+                messages.append(f'Saved {name} (md5 verified)')
+                self._maybe_close_after_download()
+            elif isinstance(exc, ChecksumMismatch):
+                messages.append(f'Rejected {name}: the file does not match the book\'s md5')
+            else:
+                # Pages (NotAFile) and failed transfers are left to WebEngine, which can handle sessions and
+                # challenges. Nothing will resume the segmented attempt once it has the URL, so drop its partial file.
+                engine.discard()
+                self._webengine_urls.add(url)
+                self.view.page().download(QUrl(url), name)
+        if not self._downloads:
+            self._download_timer.stop()
+        if messages:
+            self.download_status.setText('\n'.join(messages))
+            self.download_status.show()
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from calibre.utils.config import JSONConfig
+from calibre_plugins.store_annas_archive.cancellation import CancelToken, cancel_scope
+from calibre_plugins.store_annas_archive.ratelimit import BACKGROUND, priority
+from calibre_plugins.store_annas_archive.settings import ConfigSnapshot
+
+__all__ = ('AvailabilityStore', 'AvailabilityScanner', 'wanted_item_key')
+
+
+def wanted_item_key(item: dict) -> str:
+    """
+    Stable key for a wanted item: its Bookworm id when present, otherwise a digest of its searchable fields.
+    """
+    item_id = item.get('id')
+    if item_id not in (None, ''):
+        return f'id:{item_id}'
+    return 'sha1:' + hashlib.sha1(json.dumps(
+        (item.get('title'), item.get('authors'), item.get('isbns')), default=str
+    ).encode('utf-8')).hexdigest()
+
+
+def _terms_digest(terms: Sequence[str]) -> str:
+    return hashlib.sha1('\n'.join(terms).encode('utf-8')).hexdigest()[:16]
+
+
+class AvailabilityStore:
+    """
+    Persisted results of the background availability scan.
+
+    Each entry records whether any search term of a wanted item found a result, the best md5, the formats seen and
+    when it was checked. Entries go stale after `HIT_TTL`/`MISS_TTL` or when the item's search terms change.
+    """
+    HIT_TTL = 7 * 24 * 3600
+    MISS_TTL = 24 * 3600
+    MAX_CHANGES = 10000
+
+    def __init__(self, config_name: str = 'store/stores/annas_archive_availability'):
+        self._config = ConfigSnapshot(JSONConfig(config_name))
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = dict(self._config.get('items', {}))
+        self._dirty = False
+        # Bumped on every change so widgets can cheaply tell whether they need to refresh.
+        self.revision = 0
+        # Keys recorded since revision `_changes_base`, oldest first, so widgets can update only those.
+        self._changes: List[str] = []
+        self._changes_base = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def is_fresh(self, key: str, terms: Sequence[str], now: Optional[float] = None) -> bool:
+        entry = self.get(key)
+        if entry is None or entry.get('terms') != _terms_digest(terms):
+            return False
+        ttl = self.HIT_TTL if entry.get('hit') else self.MISS_TTL
+        return (now or time.time()) - entry.get('checked', 0) < ttl
+
+    def record(self, key: str, terms: Sequence[str], md5: Optional[str], formats: Sequence[str]):
+        with self._lock:
+            self._entries[key] = {
+                'hit': md5 is not None,
+                'md5': md5,
+                'formats': list(formats),
+                'terms': _terms_digest(terms),
+                'checked': time.time(),
+            }
+            self._dirty = True
+            self.revision += 1
+            self._changes.append(key)
+            if len(self._changes) > self.MAX_CHANGES:
+                drop = len(self._changes) // 2
+                del self._changes[:drop]
+                self._changes_base += drop
+
+    def changes_since(self, revision: int) -> Tuple[int, Optional[List[str]]]:
+        """
+        (current revision, keys recorded after `revision`); the keys are None when they are no longer known.
+        """
+        with self._lock:
+            if revision < self._changes_base:
+                return self.revision, None
+            return self.revision, self._changes[revision - self._changes_base:]
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = dict(self._entries)
+            self._dirty = False
+        self._config.set_runtime('items', entries)
+
+
+class AvailabilityScanner(threading.Thread):
+    """
+    Daemon thread that periodically resolves each wanted item through its search term chain and records whether
+    Anna's Archive has it.
+
+    Only new or stale items are searched, one request every `interval` seconds. After a full pass the thread sleeps
+    for `period` seconds, re-fetching the wanted list through `fetch_items` before the next pass, or until
+    `update_items` hands it a new list.
+    """
+    FLUSH_EVERY = 10
+    RESULTS_PER_ITEM = 5
+
+    def __init__(self, plugin, store: AvailabilityStore, fetch_items: Callable[[], List[dict]],
+                 interval: float = 5.0, period: float = 6 * 3600, timeout: int = 30):
+        super().__init__(name='AnnasArchiveAvailabilityScanner', daemon=True)
+        self.plugin = plugin
+        self.store = store
+        self.fetch_items = fetch_items
+        self.interval = interval
+        self.period = period
+        self.timeout = timeout
+        self._items: Optional[List[dict]] = None
+        self._items_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        # Set by update_items() and stop() to end the sleep between passes early.
+        self._wake = threading.Event()
+        # Cancelled by stop(), aborting the scan's request in flight.
+        self._token = CancelToken()
+
+    def update_items(self, items: List[dict]):
+        with self._items_lock:
+            self._items = list(items)
+        self._wake.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+        self._token.cancel()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def run(self):
+        # Every request of the scan, including the wanted list refreshes, yields to interactive and prefetch work.
+        with priority(BACKGROUND), cancel_scope(self._token):
+            self._run()
+
+    def _run(self):
+        while not self.stopped:
+            self._wake.clear()
+            with self._items_lock:
+                items, self._items = self._items, None
+            if items is None:
+                try:
+                    items = self.fetch_items()
+                except Exception:
+                    items = []
+            self._scan(items)
+            self.store.flush()
+            self._wake.wait(self.period)
+
+    def _scan(self, items: List[dict]):
+        pending = 0
+        # Terms (canonical ISBN-13s and titles) already resolved in this pass.
+        resolved = {}
+        for item in items:
+            if self.stopped:
+                return
+            terms = self.plugin._bookworm_terms(item)
+            key = wanted_item_key(item)
+            if not terms or self.store.is_fresh(key, terms):
+                continue
+            try:
+                md5, formats = self._resolve(terms, resolved)
+            except Exception:
+                # Leave the item unrecorded so it is retried on the next pass.
+                continue
+            self.store.record(key, terms, md5, formats)
+            pending += 1
+            if pending >= self.FLUSH_EVERY:
+                self.store.flush()
+                pending = 0
+
+    def _resolve(self, terms: Sequence[str], resolved: Dict[str, tuple]):
+        for term in terms:
+            if term not in resolved:
+                if self._stop_event.wait(self.interval):
+                    raise InterruptedError
+                results = list(self.plugin._search(self.plugin._search_url_template(term), self.RESULTS_PER_ITEM,
+                                                   self.timeout))
+                formats = []
+                for result in results:
+                    if result.formats and result.formats not in formats:
+                        formats.append(result.formats)
+                resolved[term] = (results[0].detail_item, formats) if results else (None, [])
+            if resolved[term][0] is not None:
+                return resolved[term]
+        return None, []
@@ -0,0 +1,162 @@
+"""
+Scale benchmark for the Bookworm wanted list: fetch -> sort -> sidebar build for 1k, 10k and 100k items.
+
+    python benchmarks/bench_bookworm_scale.py [--sizes 1000 10000 100000] [--chunk 16384] [--qt]
+
+Compares the previous path (json.load of the whole response, sorted() with a key function, display strings built
+again by the sidebar and the picker) with streaming ingestion (`wanted_stream.ingest_wanted`). Building the filter
+index the sidebar needs is the same for both and timed on its own. For a response the server sends already sorted,
+the time until the sidebar receives its first batch of rows is printed as well. Times are measured without tracing;
+peak memory is measured in a second, traced run. With --qt the sidebar rows are also added to a real QListWidget
+(offscreen), one item at a time versus in batches. Runs outside calibre: only standard library modules of the
+plugin are imported.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wanted_index import WantedIndex  # noqa: E402
+from wanted_stream import WantedList, ingest_wanted, wanted_display, wanted_sort_key  # noqa: E402
+
+WORDS = ('the', 'history', 'of', 'night', 'garden', 'silent', 'river', 'machine', 'empire', 'letters', 'winter',
+         'small', 'house', 'ancient', 'modern', 'theory', 'love', 'war', 'sea', 'stone')
+
+
+class ChunkedReader:
+    """
+    Stand-in for an HTTP response: sized reads return at most one socket-sized chunk, read() returns the rest.
+    """
+    def __init__(self, payload: bytes, chunk: int):
+        self.payload = payload
+        self.chunk = chunk
+        self.pos = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self.payload) - self.pos
+        else:
+            size = min(size, self.chunk)
+        data = self.payload[self.pos:self.pos + size]
+        self.pos += len(data)
+        return data
+
+
+def make_payload(count: int, seed: int = 1, in_order: bool = False) -> bytes:
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))).title()
+        authors = [f'{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}' for _ in range(rng.randint(0, 2))]
+        items.append({
+            'id': i, 'title': title, 'authors': authors,
+            'isbns': [f'978{rng.randrange(10 ** 9, 10 ** 10)}'] if rng.random() < 0.7 else [],
+            'added': '2024-01-01T00:00:00Z', 'notes': 'x' * rng.randint(0, 80),
+        })
+    if in_order:
+        items.sort(key=wanted_sort_key)
+    return json.dumps({'count': count, 'items': items}).encode('utf-8')
+
+
+def previous_path(payload: bytes, chunk: int):
+    payload = json.load(ChunkedReader(payload, chunk))
+    items = sorted(payload.get('items', []), key=wanted_sort_key)
+    sidebar = [wanted_display(item) for item in items]
+    picker = [wanted_display(item) for item in items]
+    return items, sidebar, picker
+
+
+def streaming_path(payload: bytes, chunk: int):
+    items = ingest_wanted(ChunkedReader(payload, chunk), chunk)
+    return items, items.displays
+
+
+def first_batch(payload: bytes, chunk: int):
+    """
+    Seconds until `ingest_wanted` hands over its first batch of rows, and until the whole list is ingested.
+    """
+    start = time.perf_counter()
+    first = []
+
+    def on_batch(items, displays):
+        if not first:
+            first.append(time.perf_counter() - start)
+    ingest_wanted(ChunkedReader(payload, chunk), chunk, on_batch=on_batch)
+    total = time.perf_counter() - start
+    return (first[0] if first else total), total
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def qt_rows(items: WantedList):
+    try:
+        from qt.core import QApplication, QListWidget, QListWidgetItem
+    except ImportError:
+        from PyQt5.QtWidgets import QApplication, QListWidget, QListWidgetItem
+    app = QApplication.instance() or QApplication(['bench', '-platform', 'offscreen'])
+
+    widget = QListWidget()
+    start = time.perf_counter()
+    for display, item in zip(items.displays, items):
+        lw_item = QListWidgetItem(display)
+        lw_item.setToolTip(display)
+        lw_item.setData(256, item)
+        widget.addItem(lw_item)
+    one_by_one = time.perf_counter() - start
+
+    widget = QListWidget()
+    widget.setUniformItemSizes(True)
+    start = time.perf_counter()
+    longest = 0.0
+    for first, displays in items.batches(500):
+        batch_start = time.perf_counter()
+        widget.setUpdatesEnabled(False)
+        widget.addItems(displays)
+        for row in range(first, first + len(displays)):
+            widget.item(row).setToolTip(items.displays[row])
+        widget.setUpdatesEnabled(True)
+        app.processEvents()
+        longest = max(longest, time.perf_counter() - batch_start)
+    batched = time.perf_counter() - start
+    return one_by_one, batched, longest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--chunk', type=int, default=16 * 1024)
+    parser.add_argument('--qt', action='store_true', help='also time adding the rows to a QListWidget')
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        payload = make_payload(size)
+        print(f'{size} items, {len(payload) / 1e6:.1f} MB of JSON')
+        for label, func in (('json.load + sorted()', previous_path), ('streaming ingestion', streaming_path)):
+            elapsed, peak = measure(func, payload, args.chunk)
+            print(f'  {label:<24} {elapsed * 1000:9.1f} ms   peak {peak / 1e6:7.1f} MB')
+        elapsed, peak = measure(WantedIndex, streaming_path(payload, args.chunk)[0])
+        print(f'  {"WantedIndex build":<24} {elapsed * 1000:9.1f} ms   peak {peak / 1e6:7.1f} MB')
+        first, total = first_batch(make_payload(size, in_order=True), args.chunk)
+        print(f'  {"sorted response":<24} {total * 1000:9.1f} ms   first rows after {first * 1000:.1f} ms')
+        if args.qt:
+            one_by_one, batched, longest = qt_rows(ingest_wanted(ChunkedReader(payload, args.chunk)))
+            print(f'  {"rows, one at a time":<24} {one_by_one * 1000:9.1f} ms   (one event-loop turn)')
+            print(f'  {"rows, batches of 500":<24} {batched * 1000:9.1f} ms   longest turn {longest * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
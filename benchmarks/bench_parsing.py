@@ -0,0 +1,100 @@
+"""
+Compare parsing search result pages in the calling thread with the ParsePool worker processes.
+
+    python benchmarks/bench_parsing.py [--pages 200] [--rows 100] [--workers 4]
+    calibre-debug -e benchmarks/bench_parsing.py -- [--pages 200] ...
+
+With plain Python only in-thread parsing is measured (`parsing.py` needs the standard library and lxml). The worker
+modes need calibre's worker processes and the installed plugin, so run them with calibre-debug. "sequential" is one
+caller handing pages to the pool one at a time, like a single search; "search-ahead" is one caller thread per worker,
+like the ISBN-list and `bookworm:wanted` runs.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    # Under calibre-debug this loads the installed plugins, which the worker processes import the parsers from.
+    import calibre.customize.ui  # noqa: F401
+    from calibre_plugins.store_annas_archive.parsing import ParsePool, parse_search_page
+except ImportError:
+    from parsing import ParsePool, parse_search_page  # noqa: E402
+
+ROW = (
+    '<tr>'
+    '<td><a tabindex="-1" href="/md5/{md5}"><span><img src="https://covers.example/{md5}.jpg"></span></a></td>'
+    '<td><a href="/md5/{md5}"><span>Title number {i} of a long series about things</span></a></td>'
+    '<td><a href="/search?q=author"><span>Author {i}, Another Author</span></a></td>'
+    '<td><span>Publisher</span></td><td><span>2001</span></td><td><span>file_{i}.epub</span></td>'
+    '<td><span>lgli</span></td><td><span>English [en]</span></td><td><span>Book (fiction)</span></td>'
+    '<td><a href="#"><span>epub</span></a></td><td><span>1.2MB</span></td>'
+    '</tr>'
+)
+
+
+def make_page(rows: int, seed: int) -> bytes:
+    body = ''.join(ROW.format(md5=f'{seed:08x}{i:024x}', i=i) for i in range(rows))
+    # Pad with markup the parser has to walk past, like the site's header, scripts and footer.
+    filler = '<div class="nav"><a href="#">link</a><span>text</span></div>' * 400
+    return f'<html><head><title>Search</title></head><body>{filler}<table>{body}</table>{filler}</body></html>'.encode()
+
+
+def gui_ticks(stop: threading.Event, interval: float = 0.005) -> int:
+    """
+    Stand-in for the GUI event loop: counts how often a thread needing the GIL gets to run.
+    """
+    ticks = 0
+    while not stop.is_set():
+        time.sleep(interval)
+        ticks += 1
+    return ticks
+
+
+def run(label: str, parse, pages):
+    stop = threading.Event()
+    ticks = []
+    ticker = threading.Thread(target=lambda: ticks.append(gui_ticks(stop)))
+    ticker.start()
+    start = time.perf_counter()
+    rows = parse(pages)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    ticker.join()
+    expected = elapsed / 0.005
+    print(f'{label:<28} {elapsed * 1000:9.1f} ms  {rows / elapsed:10.0f} rows/s  '
+          f'GUI ticks {ticks[0]:6d} / ~{expected:.0f} possible')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    pages = [make_page(args.rows, i) for i in range(args.pages)]
+    print(f'{args.pages} pages x {args.rows} rows, {sum(map(len, pages)) / 1e6:.1f} MB of HTML')
+
+    run('in-thread', lambda ps: sum(len(parse_search_page(p)) for p in ps), pages)
+
+    pool = ParsePool(args.workers)
+    if not pool.available:
+        print('worker parsing needs calibre: run this with calibre-debug -e')
+        return
+    with ThreadPoolExecutor(max_workers=pool.workers) as callers:
+        # Start the workers before timing, as a long-lived plugin would have done already.
+        list(callers.map(lambda p: pool.parse(parse_search_page, p), pages[:pool.workers]))
+        run(f'pool, sequential ({pool.workers} workers)',
+            lambda ps: sum(len(pool.parse(parse_search_page, p)) for p in ps), pages)
+        run(f'pool, search-ahead ({pool.workers} workers)',
+            lambda ps: sum(len(rows) for rows in callers.map(lambda p: pool.parse(parse_search_page, p), ps)), pages)
+    pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
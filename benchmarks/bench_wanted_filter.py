@@ -0,0 +1,69 @@
+"""
+Keystroke latency of the wanted-list filter box against the one-frame (16 ms) budget.
+
+    python benchmarks/bench_wanted_filter.py [--items 50000] [--queries "the history" 9781234 "night gar"]
+
+Types each query one character at a time, clearing the box in between, and times `WantedIndex.filter` plus the
+row diff (`row_changes`) the sidebar applies for every keystroke. The Qt side (one `setRowHidden` call per
+changed row) is not timed, so the number of changed rows is printed next to each keystroke. Runs outside
+calibre: only standard library modules of the plugin are imported.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wanted_index import WantedIndex, row_changes  # noqa: E402
+
+FRAME_MS = 16.0
+WORDS = ('the', 'history', 'of', 'night', 'garden', 'silent', 'river', 'machine', 'empire', 'letters', 'winter',
+         'small', 'house', 'ancient', 'modern', 'theory', 'love', 'war', 'sea', 'stone')
+
+
+def make_items(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    items = []
+    for _ in range(count):
+        items.append({
+            'title': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))).title(),
+            'authors': [f'{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}' for _ in range(rng.randint(0, 2))],
+            'isbns': [f'978{rng.randrange(10 ** 9, 10 ** 10)}'] if rng.random() < 0.7 else [],
+        })
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=50000)
+    parser.add_argument('--queries', nargs='+', default=['the history', '9781234', 'night gar', 'sil riv'])
+    args = parser.parse_args()
+
+    items = make_items(args.items)
+    start = time.perf_counter()
+    index = WantedIndex(items)
+    print(f'{args.items} items, index built in {(time.perf_counter() - start) * 1000:.0f} ms')
+
+    worst = 0.0
+    for query in args.queries:
+        index.filter('')
+        visible = None
+        print(f'typing {query!r}')
+        for end in range(1, len(query) + 1):
+            text = query[:end]
+            start = time.perf_counter()
+            result = index.filter(text)
+            hide, show = row_changes(visible, result, index.size)
+            elapsed = (time.perf_counter() - start) * 1000
+            visible = result
+            worst = max(worst, elapsed)
+            hits = index.size if result is None else len(result)
+            flag = '' if elapsed <= FRAME_MS else '  over budget'
+            print(f'  {text!r:<14} {elapsed:7.2f} ms  {hits:6d} hits  {len(hide) + len(show):6d} rows changed{flag}')
+    print(f'slowest keystroke {worst:.2f} ms (budget {FRAME_MS:.0f} ms)')
+
+
+if __name__ == '__main__':
+    main()
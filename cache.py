@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+__all__ = ('SingleFlight', 'TTLCache')
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire `ttl` seconds after being stored.
+    """
+    def __init__(self, max_entries: int = 256, ttl: float = 15 * 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller runs the function, callers arriving while it is
+    in flight wait for and share its result (or exception). Nothing is kept once the call finishes.
+
+    When `counters` is given, `<name>.calls` and `<name>.shared` are incremented on it. Waiting callers run the
+    call again themselves when it failed with one of the `retry_on` exceptions, which are specific to the caller
+    that ran it (such as its cancellation).
+    """
+    def __init__(self, name: str = 'flight', counters=None, retry_on: tuple = ()):
+        self.name = name
+        self.counters = counters
+        self.retry_on = retry_on
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, event: str):
+        if self.counters is not None:
+            self.counters.incr(f'{self.name}.{event}')
+
+    def do(self, key: Hashable, func: Callable[[], Any]):
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                leader = future is None
+                if leader:
+                    future = self._calls[key] = Future()
+            if leader:
+                break
+            self._count('shared')
+            try:
+                return future.result()
+            except self.retry_on:
+                continue
+        self._count('calls')
+        try:
+            result = func()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
@@ -0,0 +1,152 @@
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, TypeVar
+
+__all__ = ('CancelToken', 'Cancelled', 'abort_response', 'cancel_scope', 'cancellable', 'current_token')
+
+T = TypeVar('T')
+
+_context = threading.local()
+
+
+class Cancelled(Exception):
+    """
+    Raised by cancellation points once the work they belong to was cancelled.
+    """
+
+
+class CancelToken:
+    """
+    Cooperative cancellation shared by everything one search (or dialog) started.
+
+    Cancellation points call `raise_if_cancelled()`; blocking operations register a callback with `on_cancel()`
+    that interrupts them, e.g. by closing a connection. Cancelling is idempotent and runs each callback once.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise Cancelled()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Sleep for `timeout` seconds or until cancelled; returns whether the token was cancelled.
+        """
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Run `callback` when the token is cancelled (right away if it already is). Returns a function that
+        unregisters it.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._discard(callback)
+        callback()
+        return lambda: None
+
+    def _discard(self, callback):
+        with self._lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
+
+    def bind(self, func: Callable[..., T]) -> Callable[..., T]:
+        """
+        `func` wrapped to run under this token, for handing work to other threads.
+        """
+        def run(*args, **kwargs):
+            with cancel_scope(self):
+                self.raise_if_cancelled()
+                return func(*args, **kwargs)
+        return run
+
+
+def current_token() -> Optional[CancelToken]:
+    """
+    Token of the work running on the calling thread, if any.
+    """
+    return getattr(_context, 'token', None)
+
+
+@contextmanager
+def cancel_scope(token: Optional[CancelToken]):
+    previous = current_token()
+    _context.token = token
+    try:
+        yield token
+    finally:
+        _context.token = previous
+
+
+def cancellable(results: Iterator[T], token: CancelToken) -> Iterator[T]:
+    """
+    Iterate `results` with `token` as the current token only while it runs, so code of the consumer between items
+    is unaffected. Closing or abandoning the returned generator cancels the token; cancellation ends it quietly.
+    """
+    try:
+        while True:
+            with cancel_scope(token):
+                try:
+                    token.raise_if_cancelled()
+                    item = next(results)
+                except (StopIteration, Cancelled):
+                    return
+            yield item
+    finally:
+        token.cancel()
+        close = getattr(results, 'close', None)
+        if close is not None:
+            with cancel_scope(token):
+                close()
+
+
+def _find_socket(obj, depth: int = 0):
+    if obj is None or depth > 6:
+        return None
+    if isinstance(obj, socket.socket):
+        return obj
+    for name in ('_sock', 'sock', 'raw', 'fp', 'wrapped', '_fp'):
+        found = _find_socket(getattr(obj, name, None), depth + 1)
+        if found is not None:
+            return found
+    return None
+
+
+def abort_response(response):
+    """
+    Interrupt a read in progress on `response` (urllib, http.client or mechanize) from another thread.
+    """
+    sock = _find_socket(response)
+    if sock is not None:
+        try:
+            # Unlike close(), shutdown() wakes a thread blocked in recv().
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    try:
+        response.close()
+    except Exception:
+        pass
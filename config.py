@@ -6,12 +6,12 @@ from calibre_plugins.store_annas_archive.constants import (SearchConfiguration,
 try:
     from qt.core import (Qt, QWidget, QGridLayout, QVBoxLayout, QHBoxLayout, QLabel, QFrame, QGroupBox, QScrollArea,
                          QAbstractScrollArea, QComboBox, QCheckBox, QSizePolicy, QListWidget, QListWidgetItem,
-                         QAbstractItemView, QShortcut, QKeySequence, QLineEdit)
+                         QAbstractItemView, QShortcut, QKeySequence, QLineEdit, QSpinBox)
 except (ImportError, ModuleNotFoundError):
     from PyQt5.QtCore import Qt
     from PyQt5.QtWidgets import (QWidget, QGridLayout, QVBoxLayout, QHBoxLayout, QLabel, QFrame, QGroupBox, QScrollArea,
                                  QAbstractScrollArea, QComboBox, QCheckBox, QSizePolicy, QListWidget, QListWidgetItem,
-                                 QAbstractItemView, QShortcut, QLineEdit)
+                                 QAbstractItemView, QShortcut, QLineEdit, QSpinBox)
     from PyQt5.QtGui import QKeySequence
 
 load_translations()
@@ -115,6 +115,17 @@ class ConfigWidget(QWidget):
         self.close_after_download = QCheckBox(_('Close store window after download completes (inline mode only)'), link_options)
         self.close_after_download.setToolTip(_('When using the inline web view, close the store window once a download finishes'))
         link_layout.addWidget(self.close_after_download)
+        self.native_results = QCheckBox(_('Show sidebar searches as a native result list (inline mode only)'), link_options)
+        self.native_results.setToolTip(_(
+            'Clicking a wanted book lists the matches directly in the store window; the web page is only loaded '
+            'when you open a result'))
+        link_layout.addWidget(self.native_results)
+        self.segmented_downloads = QCheckBox(_('Download in parallel segments and verify the md5 (inline mode only)'),
+                                             link_options)
+        self.segmented_downloads.setToolTip(_(
+            'Downloads started from a book page are fetched by the plugin in resumable segments and rejected if the '
+            'file does not match the book\'s md5'))
+        link_layout.addWidget(self.segmented_downloads)
         horizontal_layout.addWidget(link_options)
 
         mirrors = QGroupBox(_('Mirrors'), self)
@@ -129,6 +140,39 @@ class ConfigWidget(QWidget):
         self.open_external = QCheckBox(_('Open store in external web browser'), self)
         main_layout.addWidget(self.open_external)
 
+        self.parse_offload = QCheckBox(_('Parse result pages in worker processes'), self)
+        self.parse_offload.setToolTip(_(
+            'Keeps calibre responsive during large ISBN list or Bookworm searches by parsing pages in calibre worker '
+            'processes on other CPU cores. Those searches then also run a few ISBNs or wanted books ahead, which '
+            'sends more requests to the mirrors at once'))
+        main_layout.addWidget(self.parse_offload)
+
+        watchdog_layout = QHBoxLayout()
+        self.stall_watchdog = QCheckBox(_('Log GUI freezes longer than'), self)
+        self.stall_watchdog.setToolTip(_(
+            'Writes the blocking call and the plugin\'s recent requests to store_annas_archive_stalls.log in the '
+            'plugins folder of calibre\'s configuration directory'))
+        watchdog_layout.addWidget(self.stall_watchdog)
+        self.stall_threshold = QSpinBox(self)
+        self.stall_threshold.setRange(50, 10000)
+        self.stall_threshold.setSingleStep(50)
+        self.stall_threshold.setSuffix(' ms')
+        watchdog_layout.addWidget(self.stall_threshold)
+        watchdog_layout.addStretch(1)
+        self.stall_watchdog.toggled.connect(self.stall_threshold.setEnabled)
+        main_layout.addLayout(watchdog_layout)
+
+        local_box = QGroupBox(_('Local index'), self)
+        local_layout = QVBoxLayout(local_box)
+        local_layout.setContentsMargins(6, 6, 6, 6)
+        self.local_index = QCheckBox(_('Remember every search result in a local index'), local_box)
+        self.local_index.setToolTip(_('Search it without the network by starting a query with local:'))
+        local_layout.addWidget(self.local_index)
+        self.local_hybrid = QCheckBox(_('Show matches from the local index first, while searching online'), local_box)
+        local_layout.addWidget(self.local_hybrid)
+        self.local_index.toggled.connect(self.local_hybrid.setEnabled)
+        main_layout.addWidget(local_box)
+
         # Bookworm integration
         bookworm_box = QGroupBox(_('Bookworm wanted list'), self)
         bookworm_layout = QGridLayout(bookworm_box)
@@ -142,20 +186,25 @@ class ConfigWidget(QWidget):
         self.bookworm_sidebar.setToolTip(_('Show a wanted-list sidebar next to the store window'))
         bookworm_layout.addWidget(self.bookworm_sidebar, 1, 0, 1, 2)
 
+        self.bookworm_scan = QCheckBox(_('Check availability of wanted books in the background'), bookworm_box)
+        self.bookworm_scan.setToolTip(_(
+            'Periodically search Anna\'s Archive for each wanted book and mark the sidebar entries that were found'))
+        bookworm_layout.addWidget(self.bookworm_scan, 2, 0, 1, 2)
+
         bw_url_label = QLabel(_('API base URL'), bookworm_box)
         bw_url_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
-        bookworm_layout.addWidget(bw_url_label, 2, 0)
+        bookworm_layout.addWidget(bw_url_label, 3, 0)
         self.bookworm_url = QLineEdit(bookworm_box)
         self.bookworm_url.setPlaceholderText('https://bookworm.example.com')
-        bookworm_layout.addWidget(self.bookworm_url, 2, 1)
+        bookworm_layout.addWidget(self.bookworm_url, 3, 1)
 
         bw_token_label = QLabel(_('API token (optional)'), bookworm_box)
         bw_token_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
-        bookworm_layout.addWidget(bw_token_label, 3, 0)
+        bookworm_layout.addWidget(bw_token_label, 4, 0)
         self.bookworm_token = QLineEdit(bookworm_box)
         self.bookworm_token.setEchoMode(QLineEdit.EchoMode.Password)
         self.bookworm_token.setPlaceholderText(_('Leave blank if your instance is public'))
-        bookworm_layout.addWidget(self.bookworm_token, 3, 1)
+        bookworm_layout.addWidget(self.bookworm_token, 4, 1)
 
         main_layout.addWidget(bookworm_box)
 
@@ -200,11 +249,21 @@ class ConfigWidget(QWidget):
         config = self.store.config
 
         self.open_external.setChecked(config.get('open_external', False))
+        perf_opts = config.get('performance', {})
+        self.parse_offload.setChecked(perf_opts.get('parse_offload', False))
+        self.stall_watchdog.setChecked(perf_opts.get('stall_watchdog', False))
+        self.stall_threshold.setValue(perf_opts.get('stall_threshold_ms', 250))
+        self.stall_threshold.setEnabled(self.stall_watchdog.isChecked())
+        local_opts = config.get('local_index', {})
+        self.local_index.setChecked(local_opts.get('enabled', False))
+        self.local_hybrid.setChecked(local_opts.get('hybrid', False))
+        self.local_hybrid.setEnabled(self.local_index.isChecked())
         self.mirrors.load_mirrors(self.store.get_mirrors())
 
         bookworm = config.get('bookworm', {})
         self.bookworm_enabled.setChecked(bookworm.get('enabled', False))
         self.bookworm_sidebar.setChecked(bookworm.get('sidebar', True))
+        self.bookworm_scan.setChecked(bookworm.get('scan', False))
         self.bookworm_url.setText(bookworm.get('base_url', ''))
         self.bookworm_token.setText(bookworm.get('token', ''))
 
@@ -217,9 +276,22 @@ class ConfigWidget(QWidget):
         self.content_type.setChecked(link_opts.get('content_type', False))
         ui_opts = config.get('ui', {})
         self.close_after_download.setChecked(ui_opts.get('close_after_download', False))
+        self.native_results.setChecked(ui_opts.get('native_results', False))
+        self.segmented_downloads.setChecked(ui_opts.get('segmented_downloads', False))
 
     def save_settings(self):
+        # Persist pending runtime writes first so they cannot overwrite what is saved here.
+        self.store.settings.flush()
         self.store.config['open_external'] = self.open_external.isChecked()
+        self.store.config['performance'] = {
+            'parse_offload': self.parse_offload.isChecked(),
+            'stall_watchdog': self.stall_watchdog.isChecked(),
+            'stall_threshold_ms': self.stall_threshold.value()
+        }
+        self.store.config['local_index'] = {
+            'enabled': self.local_index.isChecked(),
+            'hybrid': self.local_hybrid.isChecked()
+        }
         self.store.config['mirrors'] = self.mirrors.get_mirrors()
 
         self.store.config['search'] = {
@@ -231,11 +303,16 @@ class ConfigWidget(QWidget):
             'content_type': self.content_type.isChecked()
         }
         self.store.config['ui'] = {
-            'close_after_download': self.close_after_download.isChecked()
+            'close_after_download': self.close_after_download.isChecked(),
+            'native_results': self.native_results.isChecked(),
+            'segmented_downloads': self.segmented_downloads.isChecked()
         }
         self.store.config['bookworm'] = {
             'enabled': self.bookworm_enabled.isChecked(),
             'sidebar': self.bookworm_sidebar.isChecked(),
+            'scan': self.bookworm_scan.isChecked(),
             'base_url': self.bookworm_url.text().strip(),
             'token': self.bookworm_token.text().strip()
         }
+        self.store.settings.invalidate()
+        self.store.apply_diagnostics()
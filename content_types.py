@@ -0,0 +1,90 @@
+import random
+import re
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from calibre.utils.config import JSONConfig
+from calibre_plugins.store_annas_archive.settings import ConfigSnapshot
+
+__all__ = ('ContentTypeKnowledge', 'url_pattern')
+
+_VARIABLE_SEGMENT = re.compile(r'(?=.*\d)[0-9A-Za-z_-]{8,}|\d+')
+_SCRIPT_EXTENSIONS = frozenset(('php', 'asp', 'aspx', 'cgi', 'jsp'))
+
+
+def url_pattern(url: str) -> Tuple[str, str]:
+    """
+    Host and a generalised path for `url`: ids and hashes become `*` and file names other than scripts keep only
+    their extension, so every download from the same endpoint shares one pattern.
+    """
+    parts = urlsplit(url)
+    segments = []
+    for segment in [s for s in parts.path.split('/') if s][:3]:
+        if '.' in segment:
+            ext = segment.rsplit('.', 1)[1].lower()
+            if ext not in _SCRIPT_EXTENSIONS:
+                segment = '*.' + ext
+        elif _VARIABLE_SEGMENT.fullmatch(segment):
+            segment = '*'
+        segments.append(segment)
+    return (parts.hostname or '').lower(), '/' + '/'.join(segments)
+
+
+class ContentTypeKnowledge:
+    """
+    Learned, persisted record of whether downloads from each host/path pattern come back as `application/*`.
+
+    Observations are exponentially decayed so the record follows hosts that change behaviour. Once a pattern has
+    enough evidence in one direction `decide()` answers without a HEAD request, except for a `SAMPLE_RATE` fraction
+    of calls that are still probed to re-verify it.
+    """
+    MIN_SAMPLES = 5.0
+    CONFIDENCE = 0.95
+    DECAY = 0.9
+    SAMPLE_RATE = 0.1
+
+    def __init__(self, config_name: str = 'store/stores/annas_archive_content_types'):
+        self._config = ConfigSnapshot(JSONConfig(config_name))
+        self._lock = threading.Lock()
+        self._patterns: Dict[str, Dict[str, float]] = dict(self._config.get('patterns', {}))
+        self._dirty = False
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return ''.join(url_pattern(url))
+
+    def decide(self, url: str) -> Optional[bool]:
+        """
+        True/False when the pattern of `url` reliably is/is not `application/*`, None when it should be probed.
+        """
+        with self._lock:
+            stats = self._patterns.get(self._key(url))
+        if not stats:
+            return None
+        total = stats.get('app', 0.0) + stats.get('other', 0.0)
+        if total < self.MIN_SAMPLES or random.random() < self.SAMPLE_RATE:
+            return None
+        ratio = stats.get('app', 0.0) / total
+        if ratio >= self.CONFIDENCE:
+            return True
+        if ratio <= 1 - self.CONFIDENCE:
+            return False
+        return None
+
+    def learn(self, url: str, is_application: bool):
+        key = self._key(url)
+        with self._lock:
+            stats = self._patterns.setdefault(key, {'app': 0.0, 'other': 0.0})
+            stats['app'] *= self.DECAY
+            stats['other'] *= self.DECAY
+            stats['app' if is_application else 'other'] += 1.0
+            self._dirty = True
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            patterns = {key: dict(stats) for key, stats in self._patterns.items()}
+            self._dirty = False
+        self._config.set_runtime('patterns', patterns)
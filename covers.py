@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+__all__ = ('CoverCache',)
+
+
+class CoverCache:
+    """
+    Size-bounded LRU of cover image bytes keyed by url, with de-duplicated background fetching.
+    """
+    def __init__(self, fetch: Callable[[str], bytes], max_bytes: int = 32 * 1024 * 1024, workers: int = 4):
+        self._fetch = fetch
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._entries: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='AnnasArchiveCovers')
+
+    def get(self, url: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(url)
+            if data is not None:
+                self._entries.move_to_end(url)
+            return data
+
+    def _put(self, url: str, data: bytes):
+        with self._lock:
+            if url in self._entries:
+                return
+            self._entries[url] = data
+            self._size += len(data)
+            while self._size > self._max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _load(self, url: str) -> bytes:
+        try:
+            data = self._fetch(url)
+            self._put(url, data)
+            return data
+        finally:
+            with self._lock:
+                self._pending.pop(url, None)
+
+    def fetch(self, url: str) -> Future:
+        """
+        Future resolving to the cover bytes; cached covers resolve immediately and concurrent requests share a fetch.
+        """
+        data = self.get(url)
+        if data is not None:
+            future = Future()
+            future.set_result(data)
+            return future
+        with self._lock:
+            future = self._pending.get(url)
+            if future is None:
+                future = self._pending[url] = self._executor.submit(self._load, url)
+            return future
@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, List, Optional
+from urllib.request import Request, urlopen
+
+__all__ = ('DownloadError', 'ChecksumMismatch', 'NotAFile', 'SegmentedDownload')
+
+_CONTENT_RANGE = re.compile(r'bytes\s+\d+-\d+/(\d+)')
+
+
+class DownloadError(Exception):
+    pass
+
+
+class ChecksumMismatch(DownloadError):
+    pass
+
+
+class NotAFile(DownloadError):
+    """
+    The host answered with a page (a login, challenge or error page) rather than the file.
+    """
+
+
+class _Segment:
+    def __init__(self, start: int, end: int, done: int = 0):
+        self.start = start
+        self.end = end  # inclusive, -1 when the size is unknown
+        self.done = done
+        self.finished = end >= 0 and done >= self.length
+        self.error: Optional[BaseException] = None
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start + 1
+
+    def to_json(self):
+        return [self.start, self.end, self.done]
+
+
+class SegmentedDownload:
+    """
+    Download `url` to `path` in parallel HTTP Range segments, resumable and verified against an md5.
+
+    Data is written into `<path>.part`, with the segment offsets kept in `<path>.part.json`, so an interrupted
+    download continues where it stopped the next time it is run. The file is hashed in order while the segments
+    stream in; when `expected_md5` does not match, the partial data is deleted and `ChecksumMismatch` is raised.
+    Hosts that do not honour Range requests are downloaded in a single stream. Cookies from `cookies` (a CookieJar)
+    are sent with every request; a response that looks like a web page rather than a file raises NotAFile before
+    anything is written.
+    """
+    CHUNK_SIZE = 64 * 1024
+    MIN_SEGMENT_SIZE = 1024 * 1024
+    RETRIES = 5
+    STATE_INTERVAL = 2.0
+
+    def __init__(self, url: str, path: str, expected_md5: Optional[str] = None, segments: int = 4, timeout: int = 60,
+                 limiter=None, headers: Optional[dict] = None, opener: Callable = urlopen, cookies=None):
+        self.url = url
+        self.path = path
+        self.expected_md5 = expected_md5.lower() if expected_md5 else None
+        self.max_segments = max(1, segments)
+        self.timeout = timeout
+        self.limiter = limiter
+        self.headers = dict(headers or {})
+        self.opener = opener
+        self.cookies = cookies
+        self.part_path = path + '.part'
+        self.state_path = self.part_path + '.json'
+        self.size: Optional[int] = None
+        self.ranges = False
+        self.segments: List[_Segment] = []
+        self._cond = threading.Condition()
+        self._cancelled = threading.Event()
+        self._state_saved = 0.0
+        self._state_lock = threading.Lock()
+
+    # Progress, safe to read from other threads
+
+    @property
+    def bytes_done(self) -> int:
+        return sum(segment.done for segment in self.segments)
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    # Setup
+
+    def _open(self, start: int = 0, end: Optional[int] = None):
+        headers = dict(self.headers)
+        if start or end is not None:
+            headers['Range'] = f'bytes={start}-{"" if end is None or end < 0 else end}'
+        request = Request(self.url, headers=headers)
+        if self.cookies is not None:
+            self.cookies.add_cookie_header(request)
+        return self.opener(request, timeout=self.timeout)
+
+    def _slot(self):
+        return self.limiter.request(self.url, timeout=self.timeout) if self.limiter is not None else nullcontext()
+
+    def _connect(self, start: int = 0, end: Optional[int] = None):
+        """
+        Open a response; the host's limiter slot is only held until its headers have arrived, so a transfer that
+        takes minutes never keeps the other requests to that host (or the other segments) waiting.
+        """
+        with self._slot():
+            return self._open(start, end)
+
+    def _probe(self):
+        """
+        Size of the file and whether the host serves byte ranges.
+        """
+        with self._connect(0, 0) as resp:
+            status = getattr(resp, 'status', None) or resp.getcode()
+            content_type = (resp.headers.get('Content-Type') or '').split(';', 1)[0].strip().lower()
+            match = _CONTENT_RANGE.match(resp.headers.get('Content-Range', ''))
+            if status == 206 and match:
+                size, ranges = int(match.group(1)), True
+            else:
+                length = resp.headers.get('Content-Length')
+                size, ranges = (int(length) if length and length.isdigit() else None), False
+        # Hosts that want a session or a challenge solved first answer 200 with a page.
+        if content_type.startswith('text/') or (
+                not content_type.startswith('application/') and (not ranges or size is None)):
+            raise NotAFile(f'Host answered with {content_type or "an untyped response"} instead of the file')
+        return size, ranges
+
+    def _load_state(self) -> bool:
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if state.get('url') != self.url or not state.get('ranges') or not os.path.exists(self.part_path):
+            return False
+        self.size = state.get('size')
+        self.ranges = True
+        self.segments = [_Segment(*segment) for segment in state.get('segments', ())]
+        return bool(self.segments)
+
+    def _save_state(self, force: bool = False):
+        with self._state_lock:
+            now = time.monotonic()
+            if not force and now - self._state_saved < self.STATE_INTERVAL:
+                return
+            self._state_saved = now
+            state = {
+                'url': self.url, 'size': self.size, 'ranges': self.ranges,
+                'segments': [segment.to_json() for segment in self.segments],
+            }
+            tmp = self.state_path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp, self.state_path)
+
+    def _plan(self, size: Optional[int], ranges: bool):
+        self.size = size
+        self.ranges = bool(size) and ranges
+        if not size or not ranges:
+            self.segments = [_Segment(0, (size or 0) - 1)]
+        else:
+            count = max(1, min(self.max_segments, size // self.MIN_SEGMENT_SIZE))
+            bounds = [size * i // count for i in range(count + 1)]
+            self.segments = [_Segment(bounds[i], bounds[i + 1] - 1) for i in range(count)]
+        with open(self.part_path, 'wb') as f:
+            if size:
+                f.truncate(size)
+        self._save_state(force=True)
+
+    # Transfer
+
+    def _fetch_segment(self, segment: _Segment):
+        attempt = 0
+        while not segment.finished and not self._cancelled.is_set():
+            try:
+                start = segment.start + segment.done
+                ranged = self.ranges and (segment.done or len(self.segments) > 1)
+                with self._connect(start, segment.end) if ranged else self._connect() as resp, \
+                        open(self.part_path, 'r+b') as f:
+                    if ranged and (getattr(resp, 'status', None) or resp.getcode()) != 206:
+                        raise DownloadError('Host ignored the Range request')
+                    f.seek(start)
+                    while not self._cancelled.is_set():
+                        chunk = resp.read(self.CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        if segment.end >= 0:
+                            chunk = chunk[:segment.length - segment.done]
+                        f.write(chunk)
+                        f.flush()
+                        with self._cond:
+                            segment.done += len(chunk)
+                            self._cond.notify_all()
+                        self._save_state()
+                        if segment.end >= 0 and segment.done >= segment.length:
+                            break
+                if self._cancelled.is_set():
+                    return
+                if segment.end < 0 or segment.done >= segment.length:
+                    with self._cond:
+                        segment.finished = True
+                        self._cond.notify_all()
+                    return
+                raise DownloadError('Connection closed before the segment was complete')
+            except Exception as exc:
+                attempt += 1
+                if not self.ranges or attempt > self.RETRIES:
+                    with self._cond:
+                        segment.error = exc
+                        self._cond.notify_all()
+                    return
+                self._cancelled.wait(min(30, 2 ** attempt))
+
+    def _hash_in_order(self):
+        """
+        md5 of the file, read back segment by segment as soon as each byte range has been written.
+        """
+        md5 = hashlib.md5()
+        # Unbuffered, so read-ahead never picks up the zeros of a region that has not been written yet
+        with open(self.part_path, 'rb', buffering=0) as f:
+            for segment in self.segments:
+                hashed = 0
+                f.seek(segment.start)
+                while True:
+                    with self._cond:
+                        while (hashed >= segment.done and not segment.finished and segment.error is None
+                               and not self._cancelled.is_set()):
+                            self._cond.wait(1)
+                        available = segment.done - hashed
+                        finished, error = segment.finished, segment.error
+                    if self._cancelled.is_set():
+                        raise DownloadError('Download cancelled')
+                    if error is not None:
+                        raise DownloadError(f'Download failed: {error}') from error
+                    while available > 0:
+                        data = f.read(min(available, self.CHUNK_SIZE))
+                        if not data:
+                            break
+                        md5.update(data)
+                        hashed += len(data)
+                        available -= len(data)
+                    if finished and hashed >= segment.done:
+                        break
+        return md5.hexdigest()
+
+    def discard(self):
+        """
+        Delete the partial data and the resume state.
+        """
+        for path in (self.part_path, self.state_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def run(self) -> str:
+        """
+        Download (or resume) the file and return its path once it has been verified.
+        """
+        if not self._load_state():
+            self._plan(*self._probe())
+
+        workers = [
+            threading.Thread(target=self._fetch_segment, args=(segment,), daemon=True,
+                             name=f'AnnasArchiveDownload-{i}')
+            for i, segment in enumerate(self.segments) if not segment.finished
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            digest = self._hash_in_order()
+        finally:
+            if self._cancelled.is_set() or any(s.error is not None for s in self.segments):
+                self.cancel()
+            for worker in workers:
+                worker.join()
+            if self.ranges and os.path.exists(self.part_path):
+                self._save_state(force=True)
+
+        if self.expected_md5 and digest != self.expected_md5:
+            self.discard()
+            raise ChecksumMismatch(f'md5 mismatch: expected {self.expected_md5}, got {digest}')
+        if self.size is None or self.size <= 0:
+            self.size = self.bytes_done
+        os.replace(self.part_path, self.path)
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+        return self.path
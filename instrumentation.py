@@ -0,0 +1,160 @@
+"""
+Request traces and GUI event-loop stall detection. Standard library only; the Qt side of the watchdog is a timer
+owned by the plugin that calls `StallWatchdog.beat()`.
+"""
+import itertools
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque, namedtuple
+from typing import Dict, List, Optional, Tuple
+
+__all__ = ('Counters', 'RequestTrace', 'TraceLog', 'StallWatchdog')
+
+
+class Counters:
+    """
+    Thread-safe named event counters.
+    """
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+RequestTrace = namedtuple('RequestTrace', 'url thread started waited duration status')
+
+
+class TraceLog:
+    """
+    Ring buffer of the most recent outbound requests plus the ones still in flight.
+
+    `started` is a `time.monotonic()` timestamp, `waited` the time spent queued in the rate limiter and `duration`
+    the time the request held its slot (None while in flight). `status` is the HTTP status, the exception name or
+    None when unknown.
+    """
+    def __init__(self, max_entries: int = 200):
+        self._finished: 'deque[RequestTrace]' = deque(maxlen=max_entries)
+        self._in_flight: Dict[int, RequestTrace] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def start(self, url: str, waited: float = 0.0) -> int:
+        trace = RequestTrace(url, threading.current_thread().name, time.monotonic(), waited, None, None)
+        with self._lock:
+            ident = next(self._ids)
+            self._in_flight[ident] = trace
+        return ident
+
+    def finish(self, ident: int, status=None):
+        with self._lock:
+            trace = self._in_flight.pop(ident, None)
+            if trace is not None:
+                self._finished.append(trace._replace(duration=time.monotonic() - trace.started, status=status))
+
+    def snapshot(self, since: float = 0.0) -> Tuple[List[RequestTrace], List[RequestTrace]]:
+        """
+        (in flight, finished since `since`) traces, oldest first.
+        """
+        with self._lock:
+            in_flight = sorted(self._in_flight.values(), key=lambda trace: trace.started)
+            finished = [trace for trace in self._finished if trace.started + (trace.duration or 0) >= since]
+        return in_flight, finished
+
+
+class StallWatchdog:
+    """
+    Detects event-loop stalls of the thread that calls `beat()`.
+
+    The owner calls `beat()` from a timer in the watched thread every few dozen milliseconds. A daemon thread
+    notices when no beat arrived for `threshold` seconds, captures the watched thread's stack at that moment and
+    appends it to `log_path` together with the requests that were in flight or finished during the stall and the
+    current `counters`.
+    """
+    MAX_LOG_BYTES = 1024 * 1024
+
+    def __init__(self, log_path: str, threshold: float = 0.25, traces: Optional[TraceLog] = None,
+                 counters: Optional[Counters] = None):
+        self.log_path = log_path
+        self.threshold = threshold
+        self.traces = traces
+        self.counters = counters
+        self.stalls = 0
+        self._thread_ident = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def beat_interval(self) -> float:
+        return max(0.02, self.threshold / 5)
+
+    def beat(self):
+        self._beat = time.monotonic()
+
+    def start(self):
+        if self._thread is None:
+            self._beat = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name='AnnasArchiveStallWatchdog', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self):
+        stalled_since = None
+        while not self._stop.wait(self.beat_interval):
+            beat = self._beat
+            now = time.monotonic()
+            if now - beat >= self.threshold:
+                if stalled_since != beat:
+                    stalled_since = beat
+                    self.stalls += 1
+                    self._report(beat, now)
+            elif stalled_since is not None:
+                self._write(f'    GUI thread resumed after {beat - stalled_since:.2f}s\n\n')
+                stalled_since = None
+
+    def _report(self, since: float, now: float):
+        frame = sys._current_frames().get(self._thread_ident)
+        stack = ''.join(traceback.format_stack(frame)) if frame is not None else '    (stack unavailable)\n'
+        lines = [
+            f'{time.strftime("%Y-%m-%d %H:%M:%S")} GUI event loop stalled for {now - since:.2f}s '
+            f'(threshold {self.threshold:.2f}s)\n',
+            'Blocking call:\n', stack,
+        ]
+        if self.traces is not None:
+            in_flight, finished = self.traces.snapshot(since)
+            lines.append('Requests during the stall:\n')
+            for trace in finished:
+                lines.append(f'    {trace.status} {trace.url} [{trace.thread}] waited {trace.waited:.2f}s, '
+                             f'took {trace.duration:.2f}s\n')
+            for trace in in_flight:
+                lines.append(f'    in flight {trace.url} [{trace.thread}] waited {trace.waited:.2f}s, '
+                             f'running {now - trace.started:.2f}s\n')
+            if not in_flight and not finished:
+                lines.append('    none\n')
+        if self.counters is not None:
+            counts = self.counters.snapshot()
+            lines.append('Counters: {}\n'.format(', '.join(f'{name}={count}' for name, count in sorted(counts.items()))
+                                                 or 'none'))
+        self._write(''.join(lines))
+
+    def _write(self, text: str):
+        try:
+            if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > self.MAX_LOG_BYTES:
+                os.replace(self.log_path, self.log_path + '.1')
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(text)
+        except OSError:
+            pass
@@ -0,0 +1,59 @@
+import re
+from typing import Iterable, List, Optional
+
+__all__ = ('canonical_isbn', 'canonical_isbns', 'is_isbn_like')
+
+_SEPARATORS = re.compile(r'[\s-]+')
+_ISBN_LIKE = re.compile(r'[0-9Xx][0-9Xx\s-]*')
+
+
+def is_isbn_like(token: str) -> bool:
+    """
+    Whether `token` is shaped like an ISBN, valid or not: ISBN characters only (digits, X, dashes and spaces) and
+    10 or 13 of them besides the separators. Years and short numbers such as "1984" are not.
+    """
+    token = token.strip()
+    return bool(_ISBN_LIKE.fullmatch(token)) and len(_SEPARATORS.sub('', token)) in (10, 13)
+
+
+def _isbn10_valid(digits: str) -> bool:
+    if not re.fullmatch(r'[0-9]{9}[0-9X]', digits):
+        return False
+    total = sum((10 - i) * (10 if c == 'X' else int(c)) for i, c in enumerate(digits))
+    return total % 11 == 0
+
+
+def _isbn13_check_digit(first12: str) -> str:
+    total = sum(int(c) * (3 if i % 2 else 1) for i, c in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def canonical_isbn(token: str) -> Optional[str]:
+    """
+    ISBN-13 for a valid ISBN-10 or ISBN-13 written with or without separators, None for anything else.
+    """
+    digits = _SEPARATORS.sub('', str(token or '')).upper()
+    if len(digits) == 10:
+        if not _isbn10_valid(digits):
+            return None
+        first12 = '978' + digits[:9]
+        return first12 + _isbn13_check_digit(first12)
+    if len(digits) == 13 and digits.isdigit() and digits[:3] in ('978', '979'):
+        if _isbn13_check_digit(digits[:12]) != digits[12]:
+            return None
+        return digits
+    return None
+
+
+def canonical_isbns(tokens: Iterable[str]) -> List[str]:
+    """
+    Canonical ISBN-13s of `tokens` in order, without invalid tokens or duplicates.
+    """
+    seen = set()
+    result = []
+    for token in tokens:
+        isbn = canonical_isbn(token)
+        if isbn is not None and isbn not in seen:
+            seen.add(isbn)
+            result.append(isbn)
+    return result
@@ -0,0 +1,113 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from typing import Iterable, List
+
+__all__ = ('LocalIndex', 'LocalRow')
+
+LocalRow = namedtuple('LocalRow', 'md5 title author formats size language cover_url last_seen')
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY,
+    md5 TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL DEFAULT '',
+    author TEXT NOT NULL DEFAULT '',
+    formats TEXT NOT NULL DEFAULT '',
+    size TEXT NOT NULL DEFAULT '',
+    language TEXT NOT NULL DEFAULT '',
+    cover_url TEXT NOT NULL DEFAULT '',
+    last_seen REAL NOT NULL
+);
+'''
+
+_FTS_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+    title, author, content='books', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS books_ai AFTER INSERT ON books BEGIN
+    INSERT INTO books_fts(rowid, title, author) VALUES (new.id, new.title, new.author);
+END;
+CREATE TRIGGER IF NOT EXISTS books_ad AFTER DELETE ON books BEGIN
+    INSERT INTO books_fts(books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author);
+END;
+CREATE TRIGGER IF NOT EXISTS books_au AFTER UPDATE OF title, author ON books BEGIN
+    INSERT INTO books_fts(books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author);
+    INSERT INTO books_fts(rowid, title, author) VALUES (new.id, new.title, new.author);
+END;
+'''
+
+_UPSERT = '''
+INSERT INTO books (md5, title, author, formats, size, language, cover_url, last_seen)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(md5) DO UPDATE SET
+    title = excluded.title, author = excluded.author, formats = excluded.formats, size = excluded.size,
+    language = excluded.language, cover_url = excluded.cover_url, last_seen = excluded.last_seen
+'''
+
+_COLUMNS = 'b.md5, b.title, b.author, b.formats, b.size, b.language, b.cover_url, b.last_seen'
+
+
+class LocalIndex:
+    """
+    SQLite index of every search row the plugin has parsed, for answering queries without the network.
+
+    Title and author are full-text indexed with FTS5 where the bundled SQLite supports it; otherwise queries fall
+    back to LIKE matching on the same table.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        try:
+            self._conn.executescript(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+        self._conn.row_factory = lambda cursor, row: LocalRow(*row)
+
+    def record(self, rows: Iterable):
+        """
+        Insert or refresh rows with `md5`, `title`, `author`, `formats`, `size`, `language` and `cover_url`.
+        """
+        now = time.time()
+        values = [
+            (row.md5, row.title or '', row.author or '', row.formats or '', row.size or '', row.language or '',
+             row.cover_url or '', now)
+            for row in rows if row.md5
+        ]
+        if not values:
+            return
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany(_UPSERT, values)
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def search(self, query: str, limit: int = 10) -> List[LocalRow]:
+        tokens = _TOKEN.findall(query)
+        if not tokens:
+            return []
+        with self._lock:
+            if self.fts:
+                match = ' '.join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+                sql = (f'SELECT {_COLUMNS} FROM books_fts f JOIN books b ON b.id = f.rowid '
+                       f'WHERE books_fts MATCH ? ORDER BY bm25(books_fts), b.last_seen DESC LIMIT ?')
+                return self._conn.execute(sql, (match, limit)).fetchall()
+            where = ' AND '.join(["(b.title || ' ' || b.author) LIKE ?"] * len(tokens))
+            sql = f'SELECT {_COLUMNS} FROM books b WHERE {where} ORDER BY b.last_seen DESC LIMIT ?'
+            return self._conn.execute(sql, [f'%{token}%' for token in tokens] + [limit]).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
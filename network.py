@@ -0,0 +1,154 @@
+import functools
+import http.client
+import socket
+import ssl
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from http.cookiejar import CookieJar
+from urllib.request import HTTPCookieProcessor, HTTPHandler, HTTPSHandler, Request, build_opener
+
+__all__ = ('DNSCache', 'TLSSessionCache', 'session_opener', 'warm_connection')
+
+
+class DNSCache:
+    """
+    Cache of `socket.getaddrinfo` answers for the connections the plugin opens itself.
+
+    Nothing process-wide is patched: only connections created through `create_connection()`, i.e. those of
+    `session_opener()`, use the cache. Failed lookups are not cached.
+    """
+    def __init__(self, ttl: float = 5 * 60):
+        self.ttl = ttl
+        self._answers: Dict[tuple, Tuple[float, list]] = {}
+        self._lock = threading.Lock()
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        if not isinstance(host, str):
+            return socket.getaddrinfo(host, port, family, type, proto, flags)
+        key = (host.lower(), port, family, type, proto, flags)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._answers.get(key)
+        if entry is not None and entry[0] > now:
+            return list(entry[1])
+        answer = socket.getaddrinfo(host, port, family, type, proto, flags)
+        with self._lock:
+            self._answers[key] = (now + self.ttl, answer)
+        return list(answer)
+
+    def create_connection(self, address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None):
+        """
+        `socket.create_connection` resolving through the cache.
+        """
+        host, port = address
+        error = None
+        for family, sock_type, proto, _, sockaddr in self.getaddrinfo(host, port, 0, socket.SOCK_STREAM):
+            sock = None
+            try:
+                sock = socket.socket(family, sock_type, proto)
+                if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                    sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+                return sock
+            except OSError as exc:
+                error = exc
+                if sock is not None:
+                    sock.close()
+        raise error if error is not None else OSError(f'getaddrinfo returned no addresses for {host}')
+
+
+class TLSSessionCache:
+    """
+    Last TLS session per (host, port), so later connections resume it instead of doing a full handshake.
+    """
+    def __init__(self):
+        self.context = ssl.create_default_context()
+        self._sessions: Dict[tuple, ssl.SSLSession] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[ssl.SSLSession]:
+        with self._lock:
+            return self._sessions.get(key)
+
+    def put(self, key, session: Optional[ssl.SSLSession]):
+        if session is not None:
+            with self._lock:
+                self._sessions[key] = session
+
+
+class _CachedHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, host, *args, dns: Optional[DNSCache] = None, **kwargs):
+        super().__init__(host, *args, **kwargs)
+        if dns is not None:
+            self._create_connection = dns.create_connection
+
+
+class _SessionHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, host, *args, sessions: TLSSessionCache, dns: Optional[DNSCache] = None, **kwargs):
+        kwargs['context'] = sessions.context
+        super().__init__(host, *args, **kwargs)
+        self._sessions = sessions
+        if dns is not None:
+            self._create_connection = dns.create_connection
+
+    def _session_key(self):
+        return (self._tunnel_host or self.host, self._tunnel_port or self.port)
+
+    def connect(self):
+        http.client.HTTPConnection.connect(self)
+        server_hostname = self._tunnel_host or self.host
+        self.sock = self._context.wrap_socket(
+            self.sock, server_hostname=server_hostname, session=self._sessions.get(self._session_key()))
+
+    def getresponse(self):
+        response = super().getresponse()
+        # TLS 1.3 tickets arrive after the handshake, so the session is only complete once a response was read.
+        if isinstance(self.sock, ssl.SSLSocket):
+            self._sessions.put(self._session_key(), self.sock.session)
+        return response
+
+
+class _CachedHTTPHandler(HTTPHandler):
+    def __init__(self, dns: Optional[DNSCache] = None):
+        super().__init__()
+        self._connection = functools.partial(_CachedHTTPConnection, dns=dns)
+
+    def http_open(self, req):
+        return self.do_open(self._connection, req)
+
+
+class _SessionHTTPSHandler(HTTPSHandler):
+    def __init__(self, sessions: TLSSessionCache, dns: Optional[DNSCache] = None):
+        super().__init__(context=sessions.context)
+        self._connection = functools.partial(_SessionHTTPSConnection, sessions=sessions, dns=dns)
+
+    def https_open(self, req):
+        return self.do_open(self._connection, req)
+
+
+def session_opener(sessions: TLSSessionCache, dns: Optional[DNSCache] = None, cookies: Optional[CookieJar] = None):
+    """
+    urllib opener whose HTTPS connections resume TLS sessions from `sessions`; all its connections resolve through
+    `dns`, and cookies the sites set are kept in `cookies` when given.
+    """
+    handlers = [_CachedHTTPHandler(dns), _SessionHTTPSHandler(sessions, dns)]
+    if cookies is not None:
+        handlers.append(HTTPCookieProcessor(cookies))
+    return build_opener(*handlers)
+
+
+def warm_connection(opener, url: str, timeout: float = 10):
+    """
+    Resolve, connect and handshake with the host of `url` through `opener`, leaving its DNS answer and TLS session
+    cached. Errors are ignored; a warm-up is only an optimisation.
+    """
+    parts = urlsplit(url)
+    try:
+        with opener.open(Request(f'{parts.scheme}://{parts.netloc}/', method='HEAD'), timeout=timeout):
+            pass
+    except Exception:
+        pass
@@ -0,0 +1,173 @@
+"""
+Pure page parsers for Anna's Archive. They take raw response bytes and return compact, picklable tuples so they can
+run in a worker process; this module must therefore only depend on the standard library and lxml (calibre is only
+imported when a worker pool is actually started).
+"""
+import os
+import re
+import threading
+from collections import namedtuple
+from typing import Callable, List, Optional, Tuple
+
+from lxml import html
+
+__all__ = ('SearchRow', 'DetailRow', 'parse_search_page', 'parse_download_links', 'parse_detail_page', 'ParsePool')
+
+SearchRow = namedtuple('SearchRow', 'md5 title author formats cover_url size language')
+DetailRow = namedtuple('DetailRow', 'title author formats cover_url')
+
+_FORMAT = re.compile(r'(?:^|[\s,])\.(epub|mobi|pdf|azw3|cbr|cbz|fb2|djvu|txt)\b', re.IGNORECASE)
+
+
+def parse_search_page(raw: bytes) -> List[SearchRow]:
+    """
+    Rows of a `display=table` search results page.
+    """
+    rows = []
+    for book in html.fromstring(raw).xpath('//table/tr'):
+        columns = book.findall('td')
+        if len(columns) < 10:
+            continue
+        cover = columns[0].xpath('./a[@tabindex="-1"]')
+        if not cover:
+            continue
+        cover = cover[0]
+        md5 = cover.get('href', '').split('/')[-1]
+        if not md5:
+            continue
+        rows.append(SearchRow(
+            md5=md5,
+            title=''.join(columns[1].xpath('./a/span/text()')),
+            author=''.join(columns[2].xpath('./a/span/text()')),
+            formats=''.join(columns[9].xpath('./a/span/text()')).upper(),
+            cover_url=''.join(cover.xpath('(./span/img/@src)[1]')),
+            size=columns[10].text_content().strip() if len(columns) > 10 else '',
+            language=columns[7].text_content().strip(),
+        ))
+    return rows
+
+
+def parse_download_links(raw: bytes) -> List[Tuple[str, str]]:
+    """
+    (href, link text) of every download link on an `/md5/` page.
+    """
+    links = []
+    for link in html.fromstring(raw).xpath('//div[@id="md5-panel-downloads"]//a[contains(@class, "js-download-link")]'):
+        href = link.get('href')
+        if href:
+            links.append((href, ' '.join(link.itertext()).strip()))
+    return links
+
+
+def _first_text(doc, *xpaths) -> str:
+    for xpath in xpaths:
+        for value in doc.xpath(xpath):
+            text = (value if isinstance(value, str) else value.text_content()).strip()
+            if text:
+                return text
+    return ''
+
+
+def parse_detail_page(raw: bytes) -> DetailRow:
+    """
+    Title, author, format and cover of the book described by an `/md5/` page.
+    """
+    doc = html.fromstring(raw)
+    title = _first_text(doc, '//meta[@property="og:title"]/@content', '//div[contains(@class, "text-3xl")]')
+    author = _first_text(doc, '//div[contains(@class, "italic")]', '//a[contains(@class, "italic")]')
+    cover_url = _first_text(doc, '//meta[@property="og:image"]/@content', '//img[contains(@src, "cover")]/@src')
+    info = _first_text(doc, '//div[contains(@class, "text-gray-500") and contains(text(), ".")]')
+    match = _FORMAT.search(info) or _FORMAT.search(' '.join(doc.xpath('//title/text()')))
+    formats = match.group(1).upper() if match else ''
+    return DetailRow(title=title, author=author, formats=formats, cover_url=cover_url)
+
+
+class ParsePool:
+    """
+    calibre worker processes for the parsers above, so bulk runs parse on other cores instead of competing with the
+    GUI for the GIL.
+
+    Workers are calibre's offload workers: separate calibre-parallel processes (never forks of the GUI process) that
+    import this module through calibre's plugin loader. Each one serves one caller at a time; up to `workers` are
+    started on demand and reused, and further callers wait for a free one. Outside calibre, or once a worker could
+    not be started or could not import the parsers, parsing silently happens in the calling thread instead.
+    """
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self._idle = []
+        self._started = 0
+        self._cond = threading.Condition()
+        try:
+            from calibre.utils.ipc.simple_worker import offload_worker
+        except ImportError:
+            offload_worker = None
+        self._start_worker = offload_worker
+        self._disabled = offload_worker is None
+
+    @property
+    def available(self) -> bool:
+        return not self._disabled
+
+    def _checkout(self):
+        with self._cond:
+            while not self._idle and self._started >= self.workers and not self._disabled:
+                self._cond.wait()
+            if self._disabled:
+                return None
+            if self._idle:
+                return self._idle.pop()
+            self._started += 1
+        try:
+            return self._start_worker()
+        except Exception:
+            self._checkin(None, False)
+            self._disable()
+            return None
+
+    def _checkin(self, worker, healthy: bool):
+        with self._cond:
+            if healthy and not self._disabled:
+                self._idle.append(worker)
+                worker = None
+            else:
+                self._started -= 1
+            self._cond.notify()
+        if worker is not None:
+            _stop_worker(worker)
+
+    def parse(self, func: Callable, raw: bytes):
+        worker = self._checkout()
+        if worker is None:
+            return func(raw)
+        try:
+            answer = worker(func.__module__, func.__name__, raw)
+        except Exception:
+            # The worker died or its connection broke; it is replaced on the next call.
+            self._checkin(worker, False)
+            return func(raw)
+        self._checkin(worker, True)
+        if answer.get('tb'):
+            if 'ImportError' in answer['tb'] or 'ModuleNotFoundError' in answer['tb']:
+                self._disable()
+            # Parse here as well, so errors surface with a local traceback.
+            return func(raw)
+        return answer.get('result')
+
+    def _disable(self):
+        with self._cond:
+            self._disabled = True
+            idle, self._idle = self._idle, []
+            self._started -= len(idle)
+            self._cond.notify_all()
+        for worker in idle:
+            _stop_worker(worker)
+
+    def shutdown(self):
+        self._disable()
+
+
+def _stop_worker(worker):
+    try:
+        worker.shutdown()
+    except Exception:
+        pass
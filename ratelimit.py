@@ -0,0 +1,276 @@
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from calibre_plugins.store_annas_archive.cancellation import Cancelled, abort_response, current_token
+
+__all__ = ('BACKGROUND', 'HostLimiter', 'HostScheduler', 'INTERACTIVE', 'PREFETCH', 'THROTTLE_CODES', 'Throttled',
+           'current_priority', 'parse_retry_after', 'priority', 'status_of')
+
+THROTTLE_CODES = frozenset((429, 503))
+
+# Priority classes, most urgent first.
+INTERACTIVE = 0
+PREFETCH = 1
+BACKGROUND = 2
+
+_context = threading.local()
+
+
+def current_priority() -> int:
+    """
+    Priority class of requests made by the calling thread; INTERACTIVE unless set with `priority()`.
+    """
+    return getattr(_context, 'priority', INTERACTIVE)
+
+
+@contextmanager
+def priority(level: int):
+    """
+    Make requests from the calling thread use the priority class `level` for the duration of the block.
+    """
+    previous = current_priority()
+    _context.priority = level
+    try:
+        yield
+    finally:
+        _context.priority = previous
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """
+    Seconds to wait according to a Retry-After header, which is either a number of seconds or an HTTP date.
+    """
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+class Throttled(Exception):
+    """
+    Raised instead of waiting for a host's limiter past the caller's deadline. It carries status 429, so mirror
+    loops skip the host as if it had answered "Too Many Requests".
+    """
+    code = 429
+
+    def __init__(self, host: str, retry_after: Optional[float] = None):
+        if retry_after:
+            message = f'{host} asked for a pause of {retry_after:.0f}s'
+        else:
+            message = f'Timed out waiting for a request slot for {host}'
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def status_of(exc: BaseException) -> Optional[int]:
+    """
+    HTTP status carried by an exception raised by urllib or mechanize, if any.
+    """
+    code = getattr(exc, 'code', None)
+    return code if isinstance(code, int) else None
+
+
+class HostLimiter:
+    """
+    Token bucket plus AIMD concurrency window for a single host.
+
+    Requests wait until a token is available, fewer than `limit` requests are in flight and any Retry-After pause
+    has elapsed. Successful responses grow the window by roughly one slot per window's worth of requests and slowly
+    raise the rate; 429/503 responses halve both and honour Retry-After.
+
+    Waiting requests are served by priority class: a request is not admitted while one of a more urgent class is
+    queued, and prefetch and background requests leave `reserved` slots and tokens to interactive ones.
+
+    Retry-After pauses are capped at `MAX_RETRY_AFTER` seconds, and a request given a `timeout` raises Throttled
+    rather than wait longer than that for its slot.
+    """
+    MAX_RETRY_AFTER = 300.0
+
+    def __init__(self, rate: float = 2.0, burst: float = 4.0, concurrency: float = 2.0,
+                 min_rate: float = 0.2, max_rate: float = 10.0, max_concurrency: float = 8.0, reserved: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.limit = concurrency
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.max_concurrency = max_concurrency
+        self.reserved = reserved
+        self.in_flight = 0
+        self._waiting = [0, 0, 0]
+        self._tokens = burst
+        self._refilled = time.monotonic()
+        self._blocked_until = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def acquire(self, level: int = INTERACTIVE, token=None, timeout: Optional[float] = None, host: str = ''):
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        unregister = token.on_cancel(self._wake) if token is not None else None
+        with self._cond:
+            self._waiting[level] += 1
+            try:
+                while True:
+                    if token is not None:
+                        token.raise_if_cancelled()
+                    now = time.monotonic()
+                    self._refill(now)
+                    # Lower classes keep `reserved` slots and tokens free, but can always run on their own.
+                    reserve = self.reserved if level > INTERACTIVE else 0
+                    needed = 1 + min(reserve, max(0, self.burst - 1))
+                    if now < self._blocked_until:
+                        wait = self._blocked_until - now
+                    elif any(self._waiting[:level]) or self.in_flight >= max(1, int(self.limit) - reserve):
+                        wait = None
+                    elif self._tokens < needed:
+                        wait = (needed - self._tokens) / self.rate
+                    else:
+                        self._tokens -= 1
+                        self.in_flight += 1
+                        return
+                    if deadline is not None:
+                        if now < self._blocked_until and self._blocked_until > deadline:
+                            # No point in waiting out a pause that ends after the caller has given up.
+                            raise Throttled(host, self._blocked_until - now)
+                        if now >= deadline:
+                            raise Throttled(host)
+                        wait = deadline - now if wait is None else min(wait, deadline - now)
+                    self._cond.wait(wait)
+            finally:
+                self._waiting[level] -= 1
+                self._cond.notify_all()
+                if unregister is not None:
+                    unregister()
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            self.limit = min(self.max_concurrency, self.limit + 1 / max(1.0, self.limit))
+            self.rate = min(self.max_rate, self.rate * 1.05)
+            self._cond.notify_all()
+
+    def on_throttled(self, retry_after: Optional[float] = None):
+        with self._cond:
+            self.limit = max(1.0, self.limit / 2)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                retry_after = min(retry_after, self.MAX_RETRY_AFTER)
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+
+class _Slot:
+    def __init__(self, limiter: HostLimiter, token=None):
+        self.limiter = limiter
+        self.token = token
+        self.reported = False
+        self.code: Optional[int] = None
+        self._untrack = []
+
+    def track(self, response):
+        """
+        Abort `response` (closing its connection) if the request's work is cancelled while it is being read.
+        """
+        if self.token is not None:
+            self._untrack.append(self.token.on_cancel(lambda: abort_response(response)))
+        return response
+
+    def _release(self):
+        for untrack in self._untrack:
+            untrack()
+
+    def feedback(self, code: Optional[int], headers=None):
+        """
+        Report the status of a response that was returned rather than raised.
+        """
+        self.reported = True
+        self.code = code
+        if code in THROTTLE_CODES:
+            self.limiter.on_throttled(parse_retry_after(headers.get('Retry-After')) if headers is not None else None)
+        elif code is None or code < 500:
+            self.limiter.on_success()
+
+
+class HostScheduler:
+    """
+    Shared registry of per-host limiters. Every outbound request should be wrapped in `request()`, which also
+    records it in `traces` when a TraceLog is given.
+    """
+    def __init__(self, traces=None, **limiter_defaults):
+        self.traces = traces
+        self._limiter_defaults = limiter_defaults
+        self._limiters: Dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, url: str) -> HostLimiter:
+        host = (urlsplit(url).hostname or '').lower()
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = HostLimiter(**self._limiter_defaults)
+            return limiter
+
+    @contextmanager
+    def request(self, url: str, level: Optional[int] = None, timeout: Optional[float] = None):
+        """
+        Hold a slot for `url`'s host for the duration of the block, queued in priority class `level` (the calling
+        thread's `current_priority()` by default). Callers pass their own request timeout as `timeout`: a slot that
+        is not free by then, or a Retry-After pause that ends later, raises Throttled.
+
+        Waiting for the slot raises Cancelled once the calling thread's cancellation token is cancelled, and
+        responses passed to `slot.track()` are aborted. Throttling errors raised inside the block are reported to
+        the limiter before being re-raised; otherwise the request counts as a success unless `feedback()` was
+        called with its status.
+        """
+        token = current_token()
+        limiter = self.limiter(url)
+        queued = time.monotonic()
+        limiter.acquire(current_priority() if level is None else level, token, timeout, urlsplit(url).hostname or '')
+        trace = self.traces.start(url, time.monotonic() - queued) if self.traces is not None else None
+        slot = _Slot(limiter, token)
+        outcome = None
+        try:
+            yield slot
+        except BaseException as exc:
+            if token is not None and token.cancelled:
+                # Whatever the aborted connection raised, the request was cancelled rather than failed.
+                outcome = 'Cancelled'
+                if isinstance(exc, Exception) and not isinstance(exc, Cancelled):
+                    raise Cancelled() from exc
+                raise
+            code = status_of(exc)
+            outcome = code or type(exc).__name__
+            if code in THROTTLE_CODES:
+                headers = getattr(exc, 'headers', None) or getattr(exc, 'hdrs', None)
+                slot.feedback(code, headers)
+            raise
+        else:
+            outcome = slot.code
+            if not slot.reported:
+                limiter.on_success()
+        finally:
+            slot._release()
+            limiter.release()
+            if trace is not None:
+                self.traces.finish(trace, outcome)
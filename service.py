@@ -0,0 +1,141 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+import time
+from typing import Any, Callable, Iterable, Optional
+from urllib.parse import urlsplit
+from urllib.request import Request
+
+from calibre import browser
+from calibre_plugins.store_annas_archive.cache import SingleFlight, TTLCache
+from calibre_plugins.store_annas_archive.cancellation import Cancelled
+from calibre_plugins.store_annas_archive.instrumentation import Counters, TraceLog
+from calibre_plugins.store_annas_archive.network import DNSCache, TLSSessionCache, session_opener, warm_connection
+from calibre_plugins.store_annas_archive.ratelimit import PREFETCH, HostScheduler, Throttled
+from calibre_plugins.store_annas_archive.settings import ConfigSnapshot
+
+__all__ = ('StoreService', 'shared_service')
+
+
+class StoreService:
+    """
+    Process-wide state shared by every AnnasArchiveStore object.
+
+    calibre's wrapper loads a new plugin object whenever the gui changes or a call fails, and store searches run
+    in parallel threads. Keeping connections, caches, mirror health and the Bookworm data here means all of them
+    reuse the same warm state for the whole calibre session. Objects that are expensive or optional are created on
+    first use through `lazy()`.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._lazy = {}
+        self.settings: Optional[ConfigSnapshot] = None
+        # Per-host token buckets and adaptive concurrency shared by every outbound request, which they also trace.
+        self.traces = TraceLog()
+        self.counters = Counters()
+        self.rate_limiter = HostScheduler(traces=self.traces)
+        # DNS answers, TLS sessions and cookies of the plugin's hosts, reused by every later request of `opener`;
+        # search, detail and download pages all go through it.
+        self.dns = DNSCache()
+        self.tls_sessions = TLSSessionCache()
+        self.cookies = CookieJar()
+        self.opener = session_opener(self.tls_sessions, self.dns, self.cookies)
+        self._warmed = {}
+        # Raw /md5/ pages, so get_details after an md5 lookup needs no request.
+        self.detail_pages = TTLCache()
+        # Index builds and wanted-list refreshes that must not block the GUI thread.
+        self.background_executor = ThreadPoolExecutor(max_workers=2)
+        # Segmented downloads handed over by the inline store.
+        self.download_executor = ThreadPoolExecutor(max_workers=2)
+        # Mirror that answered last; tried first by every search.
+        self.working_mirror: Optional[str] = None
+        # Detached sidebars, kept referenced so they are not GC'd.
+        self.sidebar_windows = []
+        # (version, WantedIndex) of the last wanted list the filter boxes were built for.
+        self.wanted_index = None
+        self.wanted_index_lock = threading.Lock()
+        self.availability_store = None
+        self.availability_scanner = None
+        # GUI-thread objects; the inline store window is only recreated when calibre's main window changes.
+        self.inline_store = None
+        self.search_watch = None
+        self.stall_watchdog = None
+        self.stall_timer = None
+
+    def attach(self, config) -> ConfigSnapshot:
+        """
+        Settings snapshot shared by all plugin objects, reading from the `config` of the newest one.
+        """
+        with self._lock:
+            if self.settings is None:
+                self.settings = ConfigSnapshot(config)
+            else:
+                self.settings.rebind(config)
+            return self.settings
+
+    def lazy(self, name: str, factory: Callable[[], Any]):
+        """
+        The object stored under `name`, created by `factory` the first time it is asked for.
+        """
+        with self._lock:
+            value = self._lazy.get(name)
+            if value is None:
+                value = self._lazy[name] = factory()
+            return value
+
+    def flight(self, name: str) -> SingleFlight:
+        """
+        Single-flight group `name`; its hit counters are reported as `<name>.calls` and `<name>.shared`.
+        """
+        return self.lazy(f'flight:{name}', lambda: SingleFlight(name, self.counters, retry_on=(Cancelled,)))
+
+    def headers(self) -> dict:
+        """
+        Default request headers (User-Agent) of calibre's browser, worked out once.
+        """
+        return self.lazy('headers', lambda: dict(browser().addheaders))
+
+    def urlopen(self, url, timeout: float = 60):
+        """
+        `urllib.request.urlopen` through the shared opener, which reuses DNS answers and TLS sessions. `url` may be a
+        Request; calibre's default headers are added to it unless it sets them itself.
+        """
+        request = url if isinstance(url, Request) else Request(url)
+        for name, value in self.headers().items():
+            if not request.has_header(name.capitalize()):
+                request.add_header(name, value)
+        return self.opener.open(request, timeout=timeout)
+
+    def warm(self, urls: Iterable[str]):
+        """
+        Resolve and handshake with the hosts of `urls` in a background thread, at most once per DNS TTL per host.
+        """
+        now = time.monotonic()
+        with self._lock:
+            urls = [url for url in urls if self._warmed.get(urlsplit(url).netloc, 0) <= now]
+            for url in urls:
+                self._warmed[urlsplit(url).netloc] = now + self.dns.ttl
+        if not urls:
+            return
+
+        def run():
+            for url in urls:
+                try:
+                    with self.rate_limiter.request(url, PREFETCH, timeout=10):
+                        warm_connection(self.opener, url)
+                except Throttled:
+                    pass
+
+        threading.Thread(target=run, name='AnnasArchiveWarmUp', daemon=True).start()
+
+
+_service: Optional[StoreService] = None
+_service_lock = threading.Lock()
+
+
+def shared_service() -> StoreService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = StoreService()
+        return _service
@@ -0,0 +1,100 @@
+import atexit
+import copy
+import threading
+import weakref
+from typing import Any, Callable, Dict, Optional
+
+__all__ = ('ConfigSnapshot',)
+
+_live_snapshots: 'weakref.WeakSet[ConfigSnapshot]' = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all():
+    for snapshot in list(_live_snapshots):
+        try:
+            snapshot.flush()
+        except Exception:
+            pass
+
+
+class ConfigSnapshot:
+    """
+    In-memory view of a calibre JSONConfig so hot paths never touch the config file.
+
+    Reads come from a parsed copy taken on first use and dropped by `invalidate()`, which the settings dialog calls
+    after saving. Values derived from it are memoised with `derived()` until the next invalidation. Runtime state is
+    written with `set_runtime()`: it is visible immediately and persisted by a single debounced, batched commit.
+    """
+    def __init__(self, config, delay: float = 2.0):
+        self.config = config
+        self.delay = delay
+        self._lock = threading.RLock()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._derived: Dict[str, Any] = {}
+        self._pending: Dict[str, Any] = {}
+        self._timer: Optional[threading.Timer] = None
+        _live_snapshots.add(self)
+
+    def _data(self) -> Dict[str, Any]:
+        if self._snapshot is None:
+            self._snapshot = copy.deepcopy(dict(self.config))
+            self._snapshot.update(self._pending)
+        return self._snapshot
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            return self._data().get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._data()
+
+    def derived(self, name: str, compute: Callable[[], Any]):
+        """
+        Value computed from the snapshot, cached until the next `invalidate()`.
+        """
+        with self._lock:
+            if name not in self._derived:
+                self._derived[name] = compute()
+            return self._derived[name]
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self._derived.clear()
+
+    def rebind(self, config):
+        """
+        Read from and write to `config` from now on. Pending runtime writes are committed to the new config so a
+        stale JSONConfig object for the same file cannot overwrite them.
+        """
+        with self._lock:
+            self.config = config
+            self.invalidate()
+        self.flush()
+
+    def set_runtime(self, key: str, value):
+        with self._lock:
+            self._data()[key] = value
+            self._pending[key] = value
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """
+        Persist pending runtime writes now, in one commit.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        # JSONConfig defers committing to disk until the with block exits.
+        with self.config:
+            for key, value in pending.items():
+                self.config[key] = value
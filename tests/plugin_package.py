@@ -0,0 +1,28 @@
+"""
+Make the plugin's standard-library modules importable as `calibre_plugins.store_annas_archive.*` outside calibre.
+
+Only the package objects are registered; the plugin's `__init__` (which needs calibre) is never executed, so tests
+can only import modules that do not depend on calibre or Qt.
+"""
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if 'calibre_plugins' not in sys.modules:
+    namespace = types.ModuleType('calibre_plugins')
+    namespace.__path__ = []
+    sys.modules['calibre_plugins'] = namespace
+if 'calibre_plugins.store_annas_archive' not in sys.modules:
+    package = types.ModuleType('calibre_plugins.store_annas_archive')
+    package.__path__ = [ROOT]
+    sys.modules['calibre_plugins.store_annas_archive'] = package
+    sys.modules['calibre_plugins'].store_annas_archive = package
+
+
+def pytest_collect_directory(path, parent):
+    # The checkout root is the plugin itself, whose __init__ needs calibre: collect it as a plain directory.
+    if str(path) == ROOT:
+        import pytest
+        return pytest.Dir.from_parent(parent, path=path)
@@ -0,0 +1,168 @@
+import gc
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import urlopen
+
+import pytest
+
+from calibre_plugins.store_annas_archive.cancellation import CancelToken, Cancelled, cancel_scope, cancellable
+from calibre_plugins.store_annas_archive.ratelimit import HostLimiter, HostScheduler
+
+
+def run_in_thread(func):
+    """
+    Run `func` on a new thread; returns (thread, outcome) where outcome receives the result or exception.
+    """
+    outcome = {}
+
+    def run():
+        try:
+            outcome['result'] = func()
+        except BaseException as exc:
+            outcome['error'] = exc
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, outcome
+
+
+@pytest.fixture
+def slow_server():
+    """
+    Server whose responses send their headers and a few bytes of the body, then stall until the test ends.
+    """
+    release = threading.Event()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Length', '1000')
+            self.end_headers()
+            self.wfile.write(b'x' * 10)
+            self.wfile.flush()
+            release.wait(10)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/'
+    release.set()
+    server.shutdown()
+    server.server_close()
+
+
+def test_cancelled_waiter_leaves_acquire():
+    limiter = HostLimiter(concurrency=1, reserved=0)
+    limiter.acquire()
+    token = CancelToken()
+    thread, outcome = run_in_thread(lambda: limiter.acquire(token=token))
+    time.sleep(0.1)
+    assert thread.is_alive()
+
+    token.cancel()
+    thread.join(1)
+    assert not thread.is_alive()
+    assert isinstance(outcome.get('error'), Cancelled)
+    # The cancelled waiter neither took the slot nor stays queued.
+    assert limiter.in_flight == 1
+    assert limiter._waiting == [0, 0, 0]
+    limiter.release()
+    limiter.acquire(timeout=1)
+
+
+def test_track_aborts_slow_body(slow_server):
+    scheduler = HostScheduler()
+    token = CancelToken()
+    started = threading.Event()
+
+    def fetch():
+        with cancel_scope(token), scheduler.request(slow_server, timeout=5) as slot:
+            response = slot.track(urlopen(slow_server, timeout=10))
+            started.set()
+            return response.read()
+
+    thread, outcome = run_in_thread(fetch)
+    assert started.wait(5)
+    time.sleep(0.1)
+    cancelled_at = time.monotonic()
+    token.cancel()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert time.monotonic() - cancelled_at < 2
+    assert isinstance(outcome.get('error'), Cancelled)
+    assert scheduler.limiter(slow_server).in_flight == 0
+
+
+def test_cancellable_closes_inner_generator():
+    token = CancelToken()
+    closed = []
+
+    def results():
+        try:
+            yield 1
+            yield 2
+        finally:
+            closed.append(token.cancelled)
+
+    search = cancellable(results(), token)
+    assert next(search) == 1
+    search.close()
+    # The token is cancelled before the inner generator runs its cleanup.
+    assert closed == [True]
+
+
+def test_abandoned_search_is_cancelled():
+    token = CancelToken()
+    closed = []
+
+    def results():
+        try:
+            yield 1
+            yield 2
+        finally:
+            closed.append(True)
+
+    search = cancellable(results(), token)
+    next(search)
+    del search
+    gc.collect()
+    assert token.cancelled
+    assert closed == [True]
+
+
+def test_no_requests_after_close():
+    scheduler = HostScheduler()
+    url = 'http://mirror.invalid/search'
+    issued = []
+    lock = threading.Lock()
+
+    def fetch(page):
+        with scheduler.request(url, timeout=5):
+            with lock:
+                issued.append(page)
+        return page
+
+    token = CancelToken()
+    executor = ThreadPoolExecutor(max_workers=2)
+    bound = token.bind(fetch)
+
+    def results():
+        for page in range(100):
+            yield executor.submit(bound, page).result()
+
+    search = cancellable(results(), token)
+    assert [next(search), next(search)] == [0, 1]
+    search.close()
+    count = len(issued)
+
+    # Work the search handed to other threads is refused as well.
+    with pytest.raises(Cancelled):
+        executor.submit(bound, 'late').result()
+    with cancel_scope(token), pytest.raises(Cancelled):
+        fetch('direct')
+    executor.shutdown()
+    assert len(issued) == count == 2
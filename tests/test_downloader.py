@@ -0,0 +1,153 @@
+import hashlib
+import os
+import re
+import threading
+from http.cookiejar import Cookie, CookieJar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from calibre_plugins.store_annas_archive.downloader import ChecksumMismatch, DownloadError, NotAFile, \
+    SegmentedDownload
+
+PAYLOAD = os.urandom(300 * 1024)
+MD5 = hashlib.md5(PAYLOAD).hexdigest()
+
+
+class SmallSegments(SegmentedDownload):
+    MIN_SEGMENT_SIZE = 64 * 1024
+
+
+class NoRetries(SmallSegments):
+    RETRIES = 0
+
+
+class FileServer(ThreadingHTTPServer):
+    """
+    Serves PAYLOAD, honouring Range requests unless `ranges` is off. Every request's Range and Cookie headers are
+    recorded; `drop_after` cuts the body of responses starting at that offset short once.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.ranges = True
+        self.content_type = 'application/epub+zip'
+        self.body = PAYLOAD
+        self.drop_after = None
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/book.epub'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        requested = self.headers.get('Range')
+        with server.lock:
+            server.requests.append((requested, self.headers.get('Cookie')))
+        body = server.body
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', requested or '') if server.ranges else None
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else len(body) - 1
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(body)}')
+            body = body[start:end + 1]
+        else:
+            start = 0
+            self.send_response(200)
+        self.send_header('Content-Type', server.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        with server.lock:
+            drop, server.drop_after = server.drop_after, None if len(body) > 1 else server.drop_after
+        if drop is not None and len(body) > 1:
+            self.wfile.write(body[:drop])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = FileServer()
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_ranged_download(server, tmp_path):
+    path = str(tmp_path / 'book.epub')
+    download = SmallSegments(server.url, path, MD5, segments=4, timeout=10)
+    assert download.run() == path
+    assert read(path) == PAYLOAD
+    assert download.ranges and len(download.segments) == 4
+    assert not os.path.exists(path + '.part') and not os.path.exists(path + '.part.json')
+
+
+def test_unranged_download(server, tmp_path):
+    server.ranges = False
+    path = str(tmp_path / 'book.epub')
+    download = SmallSegments(server.url, path, MD5, segments=4, timeout=10)
+    download.run()
+    assert read(path) == PAYLOAD
+    assert not download.ranges and len(download.segments) == 1
+
+
+def test_resume_after_drop(server, tmp_path):
+    path = str(tmp_path / 'book.epub')
+    server.drop_after = 10 * 1024
+    with pytest.raises(DownloadError):
+        NoRetries(server.url, path, MD5, segments=4, timeout=10).run()
+    assert os.path.exists(path + '.part.json')
+
+    server.requests.clear()
+    download = NoRetries(server.url, path, MD5, segments=4, timeout=10)
+    download.run()
+    assert read(path) == PAYLOAD
+    # Only what was missing is requested again: no probe and no segment from its start.
+    starts = sorted(int(re.match(r'bytes=(\d+)', requested).group(1)) for requested, _ in server.requests)
+    planned = [segment.start for segment in download.segments]
+    assert len(starts) <= len(planned)
+    assert any(start not in planned for start in starts)
+
+
+def test_checksum_mismatch(server, tmp_path):
+    path = str(tmp_path / 'book.epub')
+    with pytest.raises(ChecksumMismatch):
+        SmallSegments(server.url, path, '0' * 32, segments=4, timeout=10).run()
+    assert not any(os.path.exists(p) for p in (path, path + '.part', path + '.part.json'))
+
+
+@pytest.mark.parametrize('content_type, ranges', [('text/html', True), ('', False)])
+def test_page_instead_of_file(server, tmp_path, content_type, ranges):
+    server.content_type = content_type
+    server.ranges = ranges
+    server.body = b'<html>Checking your browser</html>'
+    path = str(tmp_path / 'book.epub')
+    with pytest.raises(NotAFile):
+        SmallSegments(server.url, path, MD5, timeout=10).run()
+    assert not os.path.exists(path + '.part')
+
+
+def test_cookies_are_sent(server, tmp_path):
+    jar = CookieJar()
+    jar.set_cookie(Cookie(0, 'session', 'abc', None, False, '127.0.0.1', False, False, '/', True, False, None, True,
+                          None, None, {}))
+    path = str(tmp_path / 'book.epub')
+    SmallSegments(server.url, path, MD5, segments=2, timeout=10, cookies=jar).run()
+    assert server.requests and all(cookie == 'session=abc' for _, cookie in server.requests)
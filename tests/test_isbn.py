@@ -0,0 +1,54 @@
+import pytest
+
+from calibre_plugins.store_annas_archive.isbn import canonical_isbn, canonical_isbns, is_isbn_like
+
+
+@pytest.mark.parametrize('token, expected', [
+    ('9780306406157', '9780306406157'),
+    ('978-0-306-40615-7', '9780306406157'),
+    ('9791090636071', '9791090636071'),
+    # ISBN-10s map to their ISBN-13.
+    ('0306406152', '9780306406157'),
+    ('0-306-40615-2', '9780306406157'),
+    (' 0 306 40615 2 ', '9780306406157'),
+    ('080442957X', '9780804429573'),
+    ('080442957x', '9780804429573'),
+])
+def test_canonical_isbn(token, expected):
+    assert canonical_isbn(token) == expected
+
+
+@pytest.mark.parametrize('token', [
+    '0306406153',  # ISBN-10 check digit
+    '9780306406158',  # ISBN-13 check digit
+    '1234567890123',  # neither 978 nor 979
+    '03064061X2',  # X only as the check digit
+    '97803064061',
+    '1984',
+    '',
+    None,
+])
+def test_invalid_isbn(token):
+    assert canonical_isbn(token) is None
+
+
+def test_canonical_isbns_drops_invalid_and_duplicates():
+    tokens = ['0306406152', '978-0-306-40615-7', '0306406153', '080442957x', '9780804429573']
+    assert canonical_isbns(tokens) == ['9780306406157', '9780804429573']
+
+
+@pytest.mark.parametrize('token', ['0306406152', '978-0-306-40615-7', '080442957x', '0306406153'])
+def test_isbn_like(token):
+    # Shape only: a wrong check digit still looks like an ISBN.
+    assert is_isbn_like(token)
+
+
+@pytest.mark.parametrize('token', ['1984', '2001', '97803064061', '030640615', 'isbn 0306406152', '0306406152a'])
+def test_not_isbn_like(token):
+    assert not is_isbn_like(token)
+
+
+def test_years_are_not_an_isbn_list():
+    # The query "1984, 2001" used to be searched as a list of two (invalid) ISBNs.
+    terms = [term.strip() for term in '1984, 2001'.split(',')]
+    assert not all(is_isbn_like(term) for term in terms)
@@ -0,0 +1,118 @@
+import threading
+import time
+from email.message import Message
+from urllib.error import HTTPError
+
+import pytest
+
+from calibre_plugins.store_annas_archive.ratelimit import BACKGROUND, INTERACTIVE, PREFETCH, HostLimiter, \
+    HostScheduler, Throttled, status_of
+
+URL = 'https://mirror.invalid/search'
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not reached'
+        time.sleep(0.01)
+
+
+def acquire_in_thread(limiter, level, admitted):
+    def run():
+        limiter.acquire(level, timeout=5)
+        admitted.append(level)
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def http_error(code, retry_after=None):
+    headers = Message()
+    if retry_after is not None:
+        headers['Retry-After'] = str(retry_after)
+    return HTTPError(URL, code, 'throttled', headers, None)
+
+
+def test_interactive_waiter_goes_first():
+    limiter = HostLimiter(rate=100, burst=10, concurrency=1, reserved=0)
+    limiter.acquire(INTERACTIVE)
+    admitted = []
+    # The background request queues first, yet waits for the interactive one queued after it.
+    background = acquire_in_thread(limiter, BACKGROUND, admitted)
+    wait_for(lambda: limiter._waiting[BACKGROUND] == 1)
+    interactive = acquire_in_thread(limiter, INTERACTIVE, admitted)
+    wait_for(lambda: limiter._waiting[INTERACTIVE] == 1)
+
+    limiter.release()
+    interactive.join(2)
+    time.sleep(0.05)
+    assert admitted == [INTERACTIVE]
+    limiter.release()
+    background.join(2)
+    assert admitted == [INTERACTIVE, BACKGROUND]
+
+
+def test_lower_classes_leave_reserved_slots():
+    limiter = HostLimiter(rate=100, burst=10, concurrency=3, reserved=1)
+    limiter.acquire(PREFETCH, timeout=1)
+    limiter.acquire(BACKGROUND, timeout=1)
+    with pytest.raises(Throttled):
+        limiter.acquire(BACKGROUND, timeout=0.1)
+    # The reserved slot is still there for an interactive request.
+    limiter.acquire(INTERACTIVE, timeout=0.1)
+    assert limiter.in_flight == 3
+
+
+def test_lower_class_runs_alone_within_reservation():
+    limiter = HostLimiter(rate=100, burst=10, concurrency=1, reserved=1)
+    limiter.acquire(BACKGROUND, timeout=0.5)
+    assert limiter.in_flight == 1
+
+
+def test_deadline_raises_throttled():
+    limiter = HostLimiter(rate=100, burst=10, concurrency=1, reserved=0)
+    limiter.acquire()
+    started = time.monotonic()
+    with pytest.raises(Throttled) as caught:
+        limiter.acquire(timeout=0.2, host='mirror.invalid')
+    assert 0.15 < time.monotonic() - started < 1
+    assert status_of(caught.value) == 429
+    assert limiter._waiting == [0, 0, 0]
+
+
+@pytest.mark.parametrize('code', [429, 503])
+def test_throttling_response_halves_window_and_rate(code):
+    scheduler = HostScheduler(rate=4.0, concurrency=4.0)
+    limiter = scheduler.limiter(URL)
+    with pytest.raises(HTTPError):
+        with scheduler.request(URL, timeout=1):
+            raise http_error(code)
+    assert limiter.limit == 2.0
+    assert limiter.rate == 2.0
+
+
+def test_success_grows_window():
+    scheduler = HostScheduler(rate=2.0, concurrency=2.0)
+    with scheduler.request(URL, timeout=1):
+        pass
+    limiter = scheduler.limiter(URL)
+    assert limiter.limit > 2.0 and limiter.rate > 2.0
+
+
+def test_retry_after_is_capped_and_fails_fast():
+    scheduler = HostScheduler()
+    limiter = scheduler.limiter(URL)
+    with pytest.raises(HTTPError):
+        with scheduler.request(URL, timeout=1):
+            raise http_error(429, retry_after=3600)
+    assert limiter._blocked_until - time.monotonic() <= HostLimiter.MAX_RETRY_AFTER
+
+    # A pause that outlasts the caller's timeout raises at once instead of waiting for the deadline.
+    started = time.monotonic()
+    with pytest.raises(Throttled) as caught:
+        with scheduler.request(URL, timeout=1):
+            pass
+    assert time.monotonic() - started < 0.5
+    assert status_of(caught.value) == 429
+    assert 0 < caught.value.retry_after <= HostLimiter.MAX_RETRY_AFTER
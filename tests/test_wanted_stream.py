@@ -0,0 +1,59 @@
+import io
+import json
+
+import pytest
+
+from calibre_plugins.store_annas_archive.wanted_stream import ingest_wanted, iter_json_items
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 4, 5])
+def test_number_split_across_chunks(chunk_size):
+    stream = io.BytesIO(b'{"items":[1, 12500.0]}')
+    assert list(iter_json_items(stream, chunk_size=chunk_size)) == [1, 12500.0]
+
+
+@pytest.mark.parametrize('chunk_size', range(1, 12))
+def test_values_in_any_chunking(chunk_size):
+    doc = (b'{"meta": {"n": [1, 2.5e3]}, "items": [1, -3e-2 , true,null,false, "x", {"a": 1.25}, [7, 80.5]],'
+           b' "tail": 0}')
+    assert list(iter_json_items(io.BytesIO(doc), chunk_size=chunk_size)) == json.loads(doc)['items']
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 64, 4096])
+def test_objects_decoded_together_split_only_between_elements(chunk_size):
+    # '},' inside strings and nested lists of objects must not be taken for the end of an element.
+    items = [{'title': 'a},{"b', 'parts': [{'n': 1}, {'n': '}, {'}]}, 3, {'title': '}\\', 'x': {'y': [1, {}]}}] * 20
+    doc = json.dumps({'items': items}, indent=1).encode('utf-8')
+    assert list(iter_json_items(io.BytesIO(doc), chunk_size=chunk_size)) == items
+
+
+def test_large_element():
+    item = {'title': 'x' * (2 * 1024 * 1024), 'authors': ['y']}
+    doc = json.dumps({'items': [item, {'title': 'z'}]}).encode('utf-8')
+    assert list(iter_json_items(io.BytesIO(doc), chunk_size=1024)) == [item, {'title': 'z'}]
+
+
+@pytest.mark.parametrize('doc', [b'{"items": [12x]}', b'{"items": [1', b'{"items": 3}'])
+def test_malformed(doc):
+    with pytest.raises(ValueError):
+        list(iter_json_items(io.BytesIO(doc), chunk_size=3))
+
+
+def payload(titles):
+    return json.dumps({'items': [{'title': title} for title in titles]}).encode('utf-8')
+
+
+def test_sorted_list_is_streamed_in_batches():
+    batches = []
+    items = ingest_wanted(io.BytesIO(payload(f'book {i:03d}' for i in range(7))), 16,
+                          on_batch=lambda items, displays: batches.append(displays), batch_size=3)
+    assert batches == [['book 000', 'book 001', 'book 002'], ['book 003', 'book 004', 'book 005']]
+    assert items.displays == [f'book {i:03d}' for i in range(7)]
+
+
+def test_unsorted_list_stops_streaming():
+    batches = []
+    items = ingest_wanted(io.BytesIO(payload(['a', 'b', 'c', 'e', 'd', 'f', 'g'])), 16,
+                          on_batch=lambda items, displays: batches.append(displays), batch_size=2)
+    assert batches == [['a', 'b'], ['c', 'e']]
+    assert items.displays == ['a', 'b', 'c', 'd', 'e', 'f', 'g']
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+__all__ = ('WantedIndex', 'row_changes', 'wanted_list_version')
+
+_NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+_ISBN_LIKE = re.compile(r'[0-9Xx-]+')
+
+
+def _normalize(text) -> str:
+    """
+    Casefold, strip accents and collapse punctuation so that "Émile Zola" and "emile-zola" index the same way.
+    """
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD.sub(' ', text.casefold()).strip()
+
+
+def _trigrams(text: str) -> Iterable[str]:
+    return (text[i:i + 3] for i in range(len(text) - 2))
+
+
+def wanted_list_version(items: Sequence[dict]) -> str:
+    """
+    Digest of the searchable fields of a wanted list; the index is only rebuilt when this changes.
+    """
+    digest = hashlib.sha1()
+    for item in items:
+        digest.update(json.dumps(
+            (item.get('title'), item.get('authors'), item.get('isbns')), default=str
+        ).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class WantedIndex:
+    """
+    Precomputed lookup tables for filtering the Bookworm wanted list as the user types.
+
+    Tokens of three or more characters are matched as substrings via the rarest trigram's posting list, shorter
+    tokens as word prefixes and digit tokens additionally as ISBN prefixes. Posting lists hold item positions in
+    ascending order, so results keep the order of the original list.
+    """
+    MIN_GRAM = 3
+    MIN_ISBN_PREFIX = 3
+
+    def __init__(self, items: Sequence[dict]):
+        self.size = len(items)
+        self._texts: List[str] = []
+        self._isbns: List[tuple] = []
+        self._trigrams: Dict[str, List[int]] = defaultdict(list)
+        self._prefixes: Dict[str, List[int]] = defaultdict(list)
+        self._isbn_prefixes: Dict[str, List[int]] = defaultdict(list)
+        self._last_tokens: Optional[List[str]] = None
+        self._last_result: Optional[List[int]] = None
+
+        for i, item in enumerate(items):
+            authors = item.get('authors') or []
+            text = _normalize(' '.join([str(item.get('title') or '')] + [str(a) for a in authors]))
+            # The leading space lets word-prefix checks be a single substring test.
+            self._texts.append(f' {text}')
+            for gram in set(_trigrams(text)):
+                self._trigrams[gram].append(i)
+            prefixes = set()
+            for word in text.split():
+                prefixes.update(word[:n] for n in range(1, min(len(word), self.MIN_GRAM - 1) + 1))
+            for prefix in prefixes:
+                self._prefixes[prefix].append(i)
+
+            isbns = tuple(
+                cleaned for cleaned in (str(isbn).replace('-', '').strip().upper() for isbn in item.get('isbns') or ())
+                if cleaned
+            )
+            self._isbns.append(isbns)
+            prefixes = set()
+            for isbn in isbns:
+                prefixes.update(isbn[:n] for n in range(self.MIN_ISBN_PREFIX, len(isbn) + 1))
+            for prefix in prefixes:
+                self._isbn_prefixes[prefix].append(i)
+
+    @staticmethod
+    def _tokenize(query: str) -> List[str]:
+        tokens = []
+        for raw in query.split():
+            if _ISBN_LIKE.fullmatch(raw) and any(c.isdigit() for c in raw):
+                tokens.append(raw.replace('-', '').upper())
+            else:
+                tokens.extend(_normalize(raw).split())
+        return tokens
+
+    def _candidates(self, token: str) -> Tuple[List[int], bool]:
+        """
+        Posting list that is a superset of the items matching `token`, and whether it is exact.
+        """
+        if len(token) < self.MIN_GRAM:
+            return self._prefixes.get(token, []), True
+        postings = [self._trigrams.get(gram, []) for gram in set(_trigrams(token.lower()))]
+        candidates = min(postings, key=len)
+        if not token[0].isdigit():
+            # A lone trigram's posting list is exactly the items containing it.
+            return candidates, len(token) == self.MIN_GRAM
+        isbn_hits = self._isbn_prefixes.get(token, [])
+        if not candidates:
+            return isbn_hits, True
+        if isbn_hits:
+            candidates = sorted(set(candidates).union(isbn_hits))
+        return candidates, False
+
+    def _narrow(self, pool: Sequence[int], token: str) -> List[int]:
+        """
+        The items of `pool` that match `token`.
+        """
+        texts = self._texts
+        if len(token) < self.MIN_GRAM:
+            needle = f' {token}'
+            return [i for i in pool if needle in texts[i]]
+        needle = token.lower()
+        if not token[0].isdigit():
+            return [i for i in pool if needle in texts[i]]
+        isbns = self._isbns
+        return [i for i in pool if needle in texts[i] or any(isbn.startswith(token) for isbn in isbns[i])]
+
+    def filter(self, query: str) -> Optional[List[int]]:
+        """
+        Return the positions of the items matching every token of `query`, or None when nothing filters.
+        """
+        tokens = self._tokenize(query)
+        if not tokens:
+            self._last_tokens = self._last_result = None
+            return None
+
+        (pool, exact), token = min(((self._candidates(token), token) for token in tokens),
+                                   key=lambda entry: len(entry[0][0]))
+        checks = [t for t in tokens if t != token] if exact else tokens
+        # Typing usually extends the previous query; then only the previous hits need to be re-checked, and only
+        # against the tokens that changed. That is cheaper than a fresh lookup unless the posting list is smaller.
+        last = self._last_tokens
+        if (last is not None and len(tokens) >= len(last) and len(self._last_result) <= len(pool)
+                and all(t == p or (len(p) >= self.MIN_GRAM and t.startswith(p)) for t, p in zip(tokens, last))):
+            pool = self._last_result
+            checks = [t for t, p in zip(tokens, last) if t != p] + tokens[len(last):]
+
+        result = list(pool)
+        for token in checks:
+            result = self._narrow(result, token)
+        self._last_tokens, self._last_result = tokens, result
+        return result
+
+
+def _complement(rows: Sequence[int], size: int) -> List[int]:
+    result = []
+    start = 0
+    for row in rows:
+        result.extend(range(start, row))
+        start = row + 1
+    result.extend(range(start, size))
+    return result
+
+
+def row_changes(previous: Optional[Sequence[int]], current: Optional[Sequence[int]],
+                size: int) -> Tuple[List[int], List[int]]:
+    """
+    (rows to hide, rows to show), both ascending, to go from the `previous` to the `current` result of
+    `WantedIndex.filter` for a list of `size` rows; None means every row is visible. Only the two results are
+    walked, so the whole list is only touched when filtering starts or ends.
+    """
+    if previous is None:
+        return ([], []) if current is None else (_complement(current, size), [])
+    if current is None:
+        return [], _complement(previous, size)
+    if previous == current:
+        return [], []
+    kept, shown = set(current), set(previous)
+    return [row for row in previous if row not in kept], [row for row in current if row not in shown]
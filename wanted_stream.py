@@ -0,0 +1,226 @@
+"""
+Incremental ingestion of Bookworm wanted-list responses. Standard library only, so the scale benchmark can run it
+outside calibre.
+"""
+import codecs
+import json
+from typing import IO, Callable, Iterator, List, Optional, Sequence, Tuple
+
+__all__ = ('WantedList', 'ingest_wanted', 'iter_json_items', 'wanted_display', 'wanted_sort_key')
+
+_WHITESPACE = ' \t\r\n'
+_DELIMITERS = ',]}'
+
+
+def iter_json_items(stream: IO[bytes], key: str = 'items', chunk_size: int = 64 * 1024) -> Iterator:
+    """
+    Elements of the `key` array of the JSON object read from `stream`, decoded as the bytes arrive.
+
+    Only the current chunk and the element being decoded are held in memory, not the whole document. The objects
+    that are complete in a chunk are decoded together in one call; an element spanning several chunks is only
+    decoded again once the buffered text has doubled, so a huge element costs linear rather than quadratic time.
+    Other members of the object before the array are decoded and skipped; anything after it is never read. An
+    object without `key` yields nothing. Raises ValueError for malformed or truncated documents and when `key` is
+    not an array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    pos = 0
+    # Text read but not yet joined onto `buf`, so a long element is not copied again for every chunk.
+    pending = []
+    pending_len = 0
+    eof = False
+
+    def more():
+        nonlocal pending_len, eof
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+        text = text_decoder.decode(chunk or b'', final=eof)
+        pending.append(text)
+        pending_len += len(text)
+
+    def flush():
+        nonlocal buf, pos, pending_len
+        if pending:
+            buf = buf[pos:] + ''.join(pending)
+            pos = 0
+            pending.clear()
+            pending_len = 0
+
+    def peek() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if pending:
+                flush()
+            elif eof:
+                return ''
+            else:
+                more()
+
+    def value():
+        nonlocal pos
+        peek()
+        need = 0
+        while True:
+            if len(buf) - pos + pending_len < need and not eof:
+                more()
+                continue
+            flush()
+            try:
+                result, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                need = 2 * (len(buf) - pos)
+                continue
+            if not isinstance(result, (str, list, dict)):
+                # A number or literal is only complete once a delimiter follows it: "12500." decodes as 12500
+                # when the rest of "12500.0" is still in the next chunk.
+                after = end
+                while after < len(buf) and buf[after] in _WHITESPACE:
+                    after += 1
+                if after == len(buf) or buf[after] not in _DELIMITERS:
+                    if not eof:
+                        need = len(buf) - pos + 1
+                        continue
+                    if after < len(buf):
+                        raise ValueError(f'Malformed JSON value at {buf[pos:after + 1]!r}')
+            pos = end
+            return result
+
+    def objects() -> list:
+        """
+        All objects from `pos` up to the last '},' in the buffer, decoded in one call; [] when there is none.
+        """
+        nonlocal pos
+        end = len(buf)
+        for _ in range(3):
+            close = buf.rfind('}', pos, end)
+            if close < 0:
+                return []
+            comma = close + 1
+            while comma < len(buf) and buf[comma] in _WHITESPACE:
+                comma += 1
+            if comma < len(buf) and buf[comma] == ',':
+                try:
+                    # Only succeeds when the cut is between elements of the array, not inside one of them.
+                    decoded = decoder.decode('[' + buf[pos:close + 1] + ']')
+                except json.JSONDecodeError:
+                    pass
+                else:
+                    pos = comma + 1
+                    return decoded
+            end = close
+        return []
+
+    if peek() != '{':
+        raise ValueError('Expected a JSON object')
+    pos += 1
+    while True:
+        char = peek()
+        if char == ',':
+            pos += 1
+            continue
+        if char == '}':
+            return
+        if char == '':
+            raise ValueError('Truncated JSON object')
+        name = value()
+        if peek() != ':':
+            raise ValueError('Malformed JSON object')
+        pos += 1
+        if name != key:
+            value()
+            continue
+        if peek() != '[':
+            raise ValueError(f'Response did not include an "{key}" list')
+        pos += 1
+        while True:
+            char = peek()
+            if char == ']':
+                return
+            if char == ',':
+                pos += 1
+                continue
+            if char == '':
+                raise ValueError(f'Truncated "{key}" list')
+            if char == '{':
+                batch = objects()
+                if batch:
+                    yield from batch
+                    continue
+            yield value()
+
+
+def wanted_display(item: dict) -> str:
+    title = item.get('title', '(untitled)')
+    authors = ', '.join(item.get('authors') or [])
+    return f'{title} | {authors}' if authors else title
+
+
+def wanted_sort_key(item: dict) -> Tuple[str, str]:
+    title = str(item.get('title') or '').strip().lower()
+    authors = item.get('authors') or []
+    first_author = str(authors[0]).strip().lower() if authors else ''
+    return title, first_author
+
+
+class WantedList(list):
+    """
+    Wanted items sorted by title then first author, with the display string of each row computed once.
+    """
+    def __init__(self, items: Sequence[dict] = (), displays: Sequence[str] = ()):
+        super().__init__(items)
+        self.displays: List[str] = list(displays) if displays else [wanted_display(item) for item in self]
+
+    def batches(self, size: int, first: int = 0) -> Iterator[Tuple[int, List[str]]]:
+        """
+        (first row, display strings) of consecutive slices of at most `size` rows, starting at row `first`.
+        """
+        for start in range(first, len(self), size):
+            yield start, self.displays[start:start + size]
+
+
+def ingest_wanted(stream: IO[bytes], chunk_size: int = 64 * 1024,
+                  on_batch: Optional[Callable[[List[dict], List[str]], None]] = None,
+                  batch_size: int = 500) -> WantedList:
+    """
+    Stream the `items` of a wanted-list response into a sorted WantedList.
+
+    While the items arrive in order only the last sort key is kept, and display strings are computed as they are
+    decoded; every `batch_size` items are also passed to `on_batch(items, displays)`, so they can be shown before the
+    rest is read. The returned list then starts with the same items. Once an item is out of order the list is
+    sorted in place at the end and the display strings are computed after that, so no key or display list is kept
+    alongside the items.
+    """
+    items = []
+    displays = []
+    last_key = None
+    in_order = True
+    sent = 0
+    for item in iter_json_items(stream, 'items', chunk_size):
+        if not isinstance(item, dict):
+            continue
+        items.append(item)
+        if not in_order:
+            continue
+        key = wanted_sort_key(item)
+        if last_key is not None and key < last_key:
+            in_order = False
+            displays = None
+            continue
+        last_key = key
+        displays.append(wanted_display(item))
+        if on_batch is not None and len(items) - sent >= batch_size:
+            on_batch(items[sent:], displays[sent:])
+            sent = len(items)
+    if not in_order:
+        items.sort(key=wanted_sort_key)
+        return WantedList(items)
+    return WantedList(items, displays)
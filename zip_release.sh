@@ -2,4 +2,5 @@
 version=$(
     sed -nE 's/^[[:space:]]*version[[:space:]]*=[[:space:]]*\(([0-9]+),[[:space:]]*([0-9]+),[[:space:]]*([0-9]+)\).*/\1.\2.\3/p' __init__.py
 )
-zip "calibre_annas_archive-v${version}.zip" __init__.py README.md plugin-import-name-store_annas_archive.txt annas_archive.py config.py constants.py
+zip "calibre_annas_archive-v${version}.zip" __init__.py README.md plugin-import-name-store_annas_archive.txt annas_archive.py config.py constants.py \
+    wanted_index.py availability.py ratelimit.py content_types.py covers.py parsing.py settings.py isbn.py cache.py local_index.py downloader.py instrumentation.py service.py network.py cancellation.py wanted_stream.py